@@ -0,0 +1,94 @@
+"""JSON REST API for mobile clients.
+
+Every endpoint accepts ``fields=a,b,c`` to select only the columns it needs,
+out of the public ones: the versions and timestamps kept for cache validation
+are never served.
+Collection endpoints are paginated with opaque cursors (``cursor``, ``limit``).
+Responses are gzip-compressed for clients that accept it.
+"""
+import gzip
+
+from flask import Blueprint, jsonify, request
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Compressing tiny bodies costs more than it saves.
+MIN_GZIP_SIZE = 500
+# The columns a client may see, also the default projection.
+PUBLIC_MOVIE_FIELDS = ('id', 'title', 'director', 'year', 'rating', 'poster_url', 'imdb_id', 'user_id')
+PUBLIC_USER_FIELDS = ('id', 'name')
+
+
+def _error(status, message):
+    response = jsonify({'error': message})
+    response.status_code = status
+    return response
+
+
+def _fields(public_fields):
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    if not fields:
+        return list(public_fields)
+    unknown = [field for field in fields if field not in public_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+
+def _page_size():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def create_api_blueprint(data_manager):
+    api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+    @api.route('/users')
+    def list_users():
+        try:
+            page = data_manager.get_users_page(cursor=request.args.get('cursor'), page_size=_page_size(),
+                                               fields=_fields(PUBLIC_USER_FIELDS))
+        except ValueError as e:
+            return _error(400, str(e))
+        return jsonify({'data': [user.to_dict() for user in page['users']], 'next_cursor': page['next_cursor']})
+
+    @api.route('/users/<int:user_id>/movies')
+    def list_user_movies(user_id):
+        if data_manager.get_user_version(user_id) is None:
+            return _error(404, f"User {user_id} not found")
+        try:
+            page = data_manager.get_movies_page(user_id, sort=request.args.get('sort', 'title'),
+                                                cursor=request.args.get('cursor'), page_size=_page_size(),
+                                                fields=_fields(PUBLIC_MOVIE_FIELDS))
+        except ValueError as e:
+            return _error(400, str(e))
+        return jsonify({'data': [movie.to_dict() for movie in page['movies']], 'next_cursor': page['next_cursor'],
+                        'prev_cursor': page['prev_cursor']})
+
+    @api.route('/movies/<int:movie_id>')
+    def get_movie(movie_id):
+        try:
+            movie = data_manager.get_movie(movie_id, fields=_fields(PUBLIC_MOVIE_FIELDS))
+        except ValueError as e:
+            return _error(400, str(e))
+        if movie is None:
+            return _error(404, f"Movie {movie_id} not found")
+        return jsonify({'data': movie.to_dict()})
+
+    @api.after_request
+    def compress(response):
+        response.vary.add('Accept-Encoding')
+        if (response.direct_passthrough or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers or not request.accept_encodings['gzip']):
+            return response
+        body = response.get_data()
+        if len(body) < MIN_GZIP_SIZE:
+            return response
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    return api
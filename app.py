@@ -1,119 +1,298 @@
-from flask import Flask, render_template, request, redirect, url_for
-from storage.sqlite_data_manager import SQLiteDataManager
+from flask import (Flask, render_template, request, redirect, url_for, abort, jsonify, make_response,
+                   stream_template, stream_with_context)
+from storage.sqlite_data_manager import SQLiteDataManager, JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING
+from movie_jobs import MovieJobQueue
+from movie_import import read_titles
+from site_builder import SiteBuilder, PAGE_FILENAME
+from precompress import compress_directory, send_precompressed
+from fragment_cache import FragmentCache
+from api import create_api_blueprint
+from movie_export import EXPORT_FORMATS, iter_export
+import config as default_config
+import hashlib
+import io
 import os
-from jinja2 import Environment, FileSystemLoader
-import requests
+from datetime import timezone
 from dotenv import load_dotenv
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movies.db'
-data_manager = SQLiteDataManager(app)
+MOVIES_PAGE_SIZE = 50
+SEARCH_LIMIT = 50
+MAX_IMPORT_TITLES = 1000
+MOVIE_CARD_TEMPLATE = '_user_movie_card.html'
 
-load_dotenv()
-OMDB_API_KEY = os.getenv('OMDB_API_KEY')
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+def _templates_hash(jinja_env):
+    """Hashes the source of every template, the same in every process serving the same templates."""
+    digest = hashlib.sha1()
+    for name in sorted(jinja_env.list_templates()):
+        digest.update(name.encode('utf-8'))
+        digest.update(jinja_env.loader.get_source(jinja_env, name)[0].encode('utf-8'))
+    return digest.hexdigest()
 
-@app.route('/users')
-def users_list():
-    users = data_manager.get_all_users()
-    return render_template('users_list.html', users=users)
 
-@app.route('/add_user', methods=['GET', 'POST'])
-def add_user():
-    if request.method == 'POST':
-        username = request.form['username']
-        data_manager.create_user(username)
-        return redirect(url_for('users_list'))
-    return render_template('add_user.html')
+def _etag(salt, *parts):
+    return hashlib.sha1('-'.join(map(str, (salt,) + parts)).encode()).hexdigest()
 
-@app.route('/generate_website/<int:user_id>')
-def generate_website(user_id):
+
+def _not_modified(etag, last_modified):
+    """Returns a 304 response if the client's copy is current, otherwise None."""
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc)
+    if request.if_none_match:
+        fresh = request.if_none_match.contains(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = last_modified <= request.if_modified_since
+    else:
+        fresh = False
+    if not fresh:
+        return None
+    return _with_validators(make_response('', 304), etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Let browsers keep the page but make them revalidate it on every visit.
+    response.cache_control.no_cache = True
+    return response
+
+
+def create_app(config=None, data_manager=None):
+    """Creates the web app.
+
+    config overrides the default settings. Pass data_manager to share one
+    that is already open, otherwise the app opens its own database.
+    """
+    load_dotenv()
+    # Static files are served by the static() route below, which can send precompressed copies.
+    app = Flask(__name__, static_folder=None)
+    app.config['SQLALCHEMY_DATABASE_URI'] = default_config.DATABASE_URI
+    app.config.update(config or {})
+    static_dir = os.path.join(app.root_path, 'static')
     try:
-        movies = data_manager.get_movies_by_user(user_id)
-
-        if not movies:
-            return "No movies to display."
-
-        html_content = render_template(
-            "index_template.html",
-            title="My Movie App", # Add a title
-            movie_grid=movies
-        )
-
-        # Create index.html within the templates folder
-        template_dir = os.path.join(os.path.dirname(__file__), 'templates')
-        index_path = os.path.join(template_dir, 'index.html')
-
-        with open(index_path, "w") as f:
-            f.write(html_content)
-
-        return redirect(url_for('index'))  # Redirect to the index route
-
-    except FileNotFoundError:
-        return "Error: index_template.html not found."
-    except Exception as e:
-        return f"An error occurred: {e}"
-
-@app.route('/users/<int:user_id>/update_movie/<int:movie_id>', methods=['GET', 'POST'])
-def update_movie(user_id, movie_id):
-    user = data_manager.get_user_by_id(user_id)
-    movie = data_manager.get_movie_by_id(movie_id)
-    if request.method == 'POST':
-        name = request.form.get('name', movie.title)
-        director = request.form.get('director', movie.director)
-        year = int(request.form.get('year', movie.year))
-        rating = float(request.form.get('rating', movie.rating))
-
-        data_manager.update_movie(movie_id, name, director, year, rating)
-        return redirect(url_for('user_movies', user_id=user_id))
-
-    return render_template('update_movie.html', user=user, movie=movie)
-
-@app.route('/delete_movie/<int:movie_id>')
-def delete_movie(movie_id):
-    data_manager.delete_movie(movie_id)
-    return redirect(url_for('index'))  # Redirect to the home page after deletion
-
-@app.route('/users/<int:user_id>')
-def user_movies(user_id):
-    user = data_manager.get_user_by_id(user_id)
-    movies = data_manager.get_movies_by_user(user_id)
-    return render_template('user_movies.html', user=user, movies=movies)
-
-@app.errorhandler(404)
-def page_not_found(e):
-    return render_template('404.html'), 404
-
-@app.route('/users/<int:user_id>/add_movie', methods=['GET', 'POST'])
-def add_movie(user_id):
-    user = data_manager.get_user_by_id(user_id)
-    if request.method == 'POST':
-        # Get the movie title from the form
-        title = request.form['name']  # Use 'name' as the field name
-
-        # Fetch movie details from OMDb API
-        url = f'http://www.omdbapi.com/?t={title}&apikey={OMDB_API_KEY}'
-        response = requests.get(url)
-        movie_data = response.json()
-
-        if movie_data.get('Response') == 'True':
-            director = movie_data.get('Director')
-            year = int(movie_data.get('Year'))
-            rating = float(movie_data.get('imdbRating'))
-            poster_url = movie_data.get('Poster')
-            imdb_id = movie_data.get('imdbID')
-
-            # Add the movie to the database
-            data_manager.add_movie(user_id, title, director, year, rating, poster_url, imdb_id)
+        compress_directory(static_dir)
+    except OSError as e:
+        # A read-only install still works, send_precompressed() falls back to the plain files.
+        app.logger.warning("Could not precompress static files: %s", e)
+
+    if data_manager is None:
+        data_manager = SQLiteDataManager(app.config['SQLALCHEMY_DATABASE_URI'], app.config,
+                                         instance_path=app.instance_path)
+    job_queue = MovieJobQueue(app, data_manager, max_workers=app.config.get('MOVIE_JOB_WORKERS', 4))
+    if app.config.get('RESUME_MOVIE_JOBS', True):
+        job_queue.resume_unfinished()
+    fragment_cache = FragmentCache(app.jinja_env, maxsize=app.config.get('FRAGMENT_CACHE_SIZE', 10000))
+    site_builder = SiteBuilder(app, data_manager, fragment_cache=fragment_cache)
+    app.extensions['data_manager'] = data_manager
+    app.extensions['job_queue'] = job_queue
+    app.extensions['site_builder'] = site_builder
+    app.register_blueprint(create_api_blueprint(data_manager))
+    # Part of every ETag so a deploy with changed templates invalidates cached pages.
+    etag_salt = _templates_hash(app.jinja_env)
+
+    @app.teardown_appcontext
+    def remove_session(exception):
+        data_manager.close_session()
+
+    @app.route('/static/<path:filename>')
+    def static(filename):
+        return send_precompressed(static_dir, filename)
 
+    @app.route('/')
+    def index():
+        return render_template('index.html')
+
+    @app.route('/users')
+    def users_list():
+        user_count, highest_id, last_modified = data_manager.get_users_version()
+        etag = _etag(etag_salt, 'users', user_count, highest_id, last_modified)
+        not_modified = _not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        users = data_manager.get_all_users()
+        response = make_response(render_template('users_list.html', users=users))
+        return _with_validators(response, etag, last_modified)
+
+    @app.route('/add_user', methods=['GET', 'POST'])
+    def add_user():
+        if request.method == 'POST':
+            username = request.form['username']
+            data_manager.create_user(username)
+            return redirect(url_for('users_list'))
+        return render_template('add_user.html')
+
+    @app.route('/generate_website/<int:user_id>')
+    def generate_website(user_id):
+        try:
+            if data_manager.get_user_by_id(user_id) is None:
+                abort(404)
+            site_builder.build_user_site(user_id)
+            return redirect(url_for('user_site', user_id=user_id))
+        except OSError as e:
+            return f"An error occurred: {e}"
+
+    @app.route('/sites/<int:user_id>/')
+    def user_site(user_id):
+        return send_precompressed(site_builder.site_dir(user_id), PAGE_FILENAME)
+
+    @app.route('/users/<int:user_id>/update_movie/<int:movie_id>', methods=['GET', 'POST'])
+    def update_movie(user_id, movie_id):
+        user = data_manager.get_user_by_id(user_id)
+        movie = data_manager.get_movie_by_id(movie_id)
+        if request.method == 'POST':
+            name = request.form.get('name', movie.title)
+            director = request.form.get('director', movie.director)
+            year = int(request.form.get('year', movie.year))
+            rating = float(request.form.get('rating', movie.rating))
+
+            data_manager.update_movie(movie_id, name, director, year, rating)
             return redirect(url_for('user_movies', user_id=user_id))
-        else:
-            return "Error fetching movie details from OMDb API."
 
-    return render_template('add_movie.html', user=user)
+        return render_template('update_movie.html', user=user, movie=movie)
+
+    @app.route('/delete_movie/<int:movie_id>')
+    def delete_movie(movie_id):
+        data_manager.delete_movie(movie_id)
+        return redirect(url_for('index'))  # Redirect to the home page after deletion
+
+    @app.route('/users/<int:user_id>')
+    def user_movies(user_id):
+        user_version = data_manager.get_user_version(user_id)
+        if user_version is None:
+            abort(404)
+        version, last_modified = user_version
+        etag = _etag(etag_salt, 'user', user_id, version, request.query_string.decode())
+        not_modified = _not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+
+        user = data_manager.get_user_by_id(user_id)
+        sort = request.args.get('sort', 'title')
+        if request.args.get('view') == 'all':
+            return _stream_user_movies(user, sort, etag, last_modified)
+
+        cursor = request.args.get('cursor')
+        try:
+            page = data_manager.get_movies_page(user_id, sort=sort, cursor=cursor, page_size=MOVIES_PAGE_SIZE)
+        except ValueError:
+            abort(400)
+        cards = fragment_cache.render_cards(MOVIE_CARD_TEMPLATE, page['movies'])
+        response = make_response(render_template('user_movies.html', user=user, cards=cards, page=page, sort=sort))
+        return _with_validators(response, etag, last_modified)
+
+    def _stream_user_movies(user, sort, etag, last_modified):
+        """Streams the whole collection, rendering cards while rows come off the cursor."""
+        try:
+            movies = data_manager.iter_movies_by_user(user['id'], order_by=sort)
+        except ValueError:
+            abort(400)
+        cards = fragment_cache.iter_cards(MOVIE_CARD_TEMPLATE, movies)
+        response = app.response_class(stream_template('user_movies.html', user=user, cards=cards, page=None, sort=sort),
+                                      mimetype='text/html')
+        return _with_validators(response, etag, last_modified)
+
+    @app.route('/users/<int:user_id>/random_movie')
+    def random_movie(user_id):
+        user = data_manager.get_user_by_id(user_id)
+        if user is None:
+            abort(404)
+        movie = data_manager.get_random_movie(user_id)
+        return render_template('random_movie.html', user=user, movie=movie)
+
+    @app.route('/users/<int:user_id>/search')
+    def search_movies(user_id):
+        user = data_manager.get_user_by_id(user_id)
+        if user is None:
+            abort(404)
+        query = request.args.get('q', '')
+        movies = data_manager.search_movies(user_id, query, limit=SEARCH_LIMIT)
+        cards = fragment_cache.render_cards(MOVIE_CARD_TEMPLATE, movies)
+        return render_template('search_results.html', user=user, query=query, cards=cards)
+
+    @app.route('/users/<int:user_id>/export')
+    def export_user_movies(user_id):
+        if data_manager.get_user_by_id(user_id) is None:
+            abort(404)
+        export_format = request.args.get('format', 'csv')
+        try:
+            chunks = iter_export(data_manager, export_format, user_id=user_id)
+        except ValueError:
+            abort(400)
+        # Batches are encoded and sent as they come off the cursor, the export is never held in memory.
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        response = app.response_class(stream_with_context(chunks), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="movies-{user_id}{extension}"'
+        return response
+
+    @app.errorhandler(404)
+    def page_not_found(e):
+        return render_template('404.html'), 404
+
+    @app.route('/users/<int:user_id>/add_movie', methods=['GET', 'POST'])
+    def add_movie(user_id):
+        user = data_manager.get_user_by_id(user_id)
+        if request.method == 'POST':
+            # Get the movie title from the form
+            title = request.form['name']  # Use 'name' as the field name
+
+            # The OMDb lookup and the insert happen in the background
+            job_id = job_queue.enqueue(user_id, title)
+            return redirect(url_for('job_status', job_id=job_id))
+
+        return render_template('add_movie.html', user=user)
+
+    @app.route('/users/<int:user_id>/import', methods=['GET', 'POST'])
+    def import_movies(user_id):
+        user = data_manager.get_user_by_id(user_id)
+        if user is None:
+            abort(404)
+        if request.method == 'POST':
+            upload = request.files.get('titles')
+            if not upload:
+                abort(400)
+            titles = read_titles(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+            if not titles:
+                return "Error: the file contains no titles.", 400
+            if len(titles) > MAX_IMPORT_TITLES:
+                return f"Error: at most {MAX_IMPORT_TITLES} titles can be imported at once.", 400
+
+            # One background job per title, the OMDb lookups never hold up this worker.
+            job_ids = job_queue.enqueue_many(user_id, titles)
+            return redirect(url_for('import_status', user_id=user_id,
+                                    first_job_id=job_ids[0], last_job_id=job_ids[-1]))
+
+        return render_template('import_movies.html', user=user)
+
+    @app.route('/users/<int:user_id>/import/<int:first_job_id>-<int:last_job_id>')
+    def import_status(user_id, first_job_id, last_job_id):
+        user = data_manager.get_user_by_id(user_id)
+        if user is None or not 0 <= last_job_id - first_job_id < MAX_IMPORT_TITLES:
+            abort(404)
+        jobs = data_manager.get_jobs(user_id, first_job_id, last_job_id)
+        if not jobs:
+            abort(404)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(jobs)
+        finished = all(job['status'] not in (JOB_PENDING, JOB_RUNNING) for job in jobs)
+        added = sum(job['status'] == JOB_DONE for job in jobs)
+        failures = [job for job in jobs if job['status'] == JOB_FAILED]
+        return render_template('import_status.html', user=user, jobs=jobs, finished=finished,
+                               added=added, failures=failures)
+
+    @app.route('/jobs/<int:job_id>')
+    def job_status(job_id):
+        job = data_manager.get_job(job_id)
+        if job is None:
+            abort(404)
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(job)
+        finished = job['status'] not in (JOB_PENDING, JOB_RUNNING)
+        return render_template('job_status.html', job=job, finished=finished)
+
+    return app
+
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
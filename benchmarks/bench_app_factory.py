@@ -0,0 +1,36 @@
+"""Measures the cost of isolated in-memory data managers and web apps.
+
+Run from the project root: python -m benchmarks.bench_app_factory [instance_count]
+"""
+import sys
+
+from app import create_app
+from benchmarks.bench_movie_stats import timed
+from storage.sqlite_data_manager import SQLiteDataManager
+
+MEMORY_URI = 'sqlite://'
+
+
+def open_and_close_data_manager():
+    data_manager = SQLiteDataManager(MEMORY_URI)
+    data_manager.create_user("bench")
+    data_manager.close()
+
+
+def create_and_close_app():
+    app = create_app({'SQLALCHEMY_DATABASE_URI': MEMORY_URI})
+    app.extensions['job_queue'].shutdown()
+    app.extensions['data_manager'].close()
+
+
+def main():
+    instance_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    data_manager_time = timed(lambda: [open_and_close_data_manager() for _ in range(instance_count)], repeat=3)
+    app_time = timed(lambda: [create_and_close_app() for _ in range(instance_count)], repeat=3)
+    print(f"{instance_count} in-memory instances")
+    print(f"  data manager: {data_manager_time / instance_count * 1000:6.2f} ms each")
+    print(f"  create_app:   {app_time / instance_count * 1000:6.2f} ms each")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Compares deleting movies one commit at a time against the batch `delete` command.
+
+Run from the project root: python -m benchmarks.bench_batch_cli [movie_count]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_movie_stats import seed
+from movie_batch import build_parser, run
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def movie_ids(data_manager, user_id):
+    return [movie['id'] for movie in data_manager.iter_movies_by_user(user_id)]
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            data_manager.create_user("bench")
+
+            seed(data_manager, 1, movie_count)
+            ids = movie_ids(data_manager, 1)
+            start = time.perf_counter()
+            for movie_id in ids:
+                data_manager.delete_movie(movie_id)
+            loop_time = time.perf_counter() - start
+
+            seed(data_manager, 1, movie_count)
+            args = build_parser().parse_args(['delete', '--user', '1', '--file', '-'])
+            stdin = io.StringIO('\n'.join(map(str, movie_ids(data_manager, 1))))
+            start = time.perf_counter()
+            run(data_manager, args, stdin=stdin, stdout=io.StringIO())
+            batch_time = time.perf_counter() - start
+
+            print(f"delete {movie_count} movies")
+            print(f"  delete_movie per row: {loop_time * 1000:8.1f} ms")
+            print(f"  batch delete command: {batch_time * 1000:8.1f} ms  ({loop_time / batch_time:.1f}x faster)")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Compares loading an exported collection with add_movie per row against the bulk importer.
+
+Run from the project root: python -m benchmarks.bench_bulk_import [movie_count]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_movie_stats import seed
+from movie_bulk_import import _rows, import_movies, validate_movie
+from movie_export import export_movies
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def exported_csv(data_manager, user_id):
+    out = io.BytesIO()
+    export_movies(data_manager, out, 'csv', user_id=user_id)
+    return out.getvalue().decode('utf-8')
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            for name in ("source", "per row", "bulk"):
+                data_manager.create_user(name)
+            seed(data_manager, 1, movie_count)
+            data = exported_csv(data_manager, 1)
+
+            start = time.perf_counter()
+            for _, row, _ in _rows(io.StringIO(data, newline=''), 'csv'):
+                data_manager.add_movie(2, **validate_movie(row))
+            loop_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            result = import_movies(data_manager, 3, io.StringIO(data, newline=''), 'csv')
+            bulk_time = time.perf_counter() - start
+            assert result.imported == movie_count and not result.rejected and not result.failure
+
+            print(f"import {movie_count} movies from CSV")
+            print(f"  add_movie per row: {loop_time * 1000:8.1f} ms")
+            print(f"  import_movies:     {bulk_time * 1000:8.1f} ms  ({loop_time / bulk_time:.1f}x faster)")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
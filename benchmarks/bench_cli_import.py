@@ -0,0 +1,49 @@
+"""Measures how long `python main.py` spends importing before the menu shows.
+
+Run from the project root: python -m benchmarks.bench_cli_import [budget_ms]
+
+Exits with status 1 if the command-line interface imports any of the web or
+network modules, or its imports take longer than the budget.
+"""
+import subprocess
+import sys
+
+# `import main` takes 350-400 ms here, against about 660 ms when it still loaded
+# the web app, so the budget leaves room for timing noise but not for Flask.
+DEFAULT_BUDGET_MS = 500
+# Loaded by the commands that need them, never at startup.
+FORBIDDEN_MODULES = ('flask', 'werkzeug', 'jinja2', 'requests', 'app', 'site_builder', 'omdb_client')
+
+
+def import_times(module):
+    """Returns {module name: (self us, cumulative us)} from `python -X importtime`."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    times = import_times('main')
+    total_ms = sum(self_us for self_us, _ in times.values()) / 1000
+    print(f"import main: {total_ms:.1f} ms, {len(times)} modules (budget {budget_ms:.0f} ms)")
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)[:10]
+    for name, (_, cumulative_us) in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    forbidden = [name for name in times if name.split('.')[0] in FORBIDDEN_MODULES]
+    if forbidden:
+        print(f"FAIL: imported {', '.join(sorted(forbidden))}")
+    if total_ms > budget_ms:
+        print(f"FAIL: {total_ms:.1f} ms is over the budget")
+    sys.exit(1 if forbidden or total_ms > budget_ms else 0)
+
+
+if __name__ == '__main__':
+    main()
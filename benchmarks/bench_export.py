@@ -0,0 +1,58 @@
+"""Shows that a streaming export takes the same memory whatever the table size.
+
+Run from the project root: python -m benchmarks.bench_export [movie_count]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_movie_stats import seed
+from movie_export import available_formats, export_movies
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+class CountingSink:
+    """A binary file that only counts what is written to it."""
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def measure(data_manager, export_format):
+    sink = CountingSink()
+    start = time.perf_counter()
+    export_movies(data_manager, sink, export_format, user_id=1)
+    seconds = time.perf_counter() - start
+    # Timed without tracing, tracemalloc slows every allocation down.
+    tracemalloc.start()
+    export_movies(data_manager, CountingSink(), export_format, user_id=1)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, sink.size
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            data_manager.create_user("bench")
+            seeded = 0
+            for count in (movie_count // 10, movie_count):
+                seed(data_manager, 1, count - seeded)
+                seeded = count
+                print(f"{count} movies")
+                for export_format in available_formats():
+                    seconds, peak, size = measure(data_manager, export_format)
+                    print(f"  {export_format:8} {seconds * 1000:8.1f} ms  peak {peak / 1024:8.1f} KiB  "
+                          f"output {size / 1024 / 1024:6.1f} MiB")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Compares the SQL movie statistics against the old in-Python computation.
+
+Run from the project root: python -m benchmarks.bench_movie_stats [movie_count]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def python_stats(data_manager, user_id):
+    movies = data_manager.get_movies_by_user(user_id)
+    ratings = [movie['rating'] for movie in movies]
+    return {
+        'average': sum(ratings) / len(ratings),
+        'median': statistics.median(ratings),
+        'best': max(movies, key=lambda movie: movie['rating']),
+        'worst': min(movies, key=lambda movie: movie['rating']),
+    }
+
+
+def seed(data_manager, user_id, movie_count):
+    rows = [{'user_id': user_id, 'title': f"Movie {i}", 'director': "Director", 'year': 1950 + i % 75,
+             'rating': round(random.uniform(1, 10), 1), 'poster_url': None, 'imdb_id': f"tt{i:07d}"}
+            for i in range(movie_count)]
+    data_manager.session.execute(data_manager.Movie.__table__.insert(), rows)
+    data_manager.session.commit()
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            data_manager.create_user("bench")
+            seed(data_manager, 1, movie_count)
+
+            python_time = timed(lambda: python_stats(data_manager, 1))
+            sql_time = timed(lambda: data_manager.get_user_movie_stats(1))
+            print(f"{movie_count} movies")
+            print(f"  python loops: {python_time * 1000:8.1f} ms")
+            print(f"  sql window:   {sql_time * 1000:8.1f} ms  ({python_time / sql_time:.1f}x faster)")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
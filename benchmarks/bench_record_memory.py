@@ -0,0 +1,49 @@
+"""Compares the memory held by movie rows as plain dicts and as MovieRecords.
+
+Run from the project root: python -m benchmarks.bench_record_memory [movie_count]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.bench_movie_stats import seed
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def measure(load):
+    """Returns (rows, bytes still allocated by load() once it returned)."""
+    gc.collect()
+    tracemalloc.start()
+    rows = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rows, size
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            data_manager.create_user("bench")
+            seed(data_manager, 1, movie_count)
+            # Warm up, so the statement cache isn't counted against the first run.
+            data_manager.get_movies_by_user(1, limit=1)
+
+            records, record_bytes = measure(lambda: data_manager.get_movies_by_user(1))
+            del records
+            dicts, dict_bytes = measure(lambda: [movie.to_dict() for movie in data_manager.get_movies_by_user(1)])
+            del dicts
+            print(f"{movie_count} movies")
+            print(f"  dicts:   {dict_bytes / movie_count:7.1f} bytes/row")
+            print(f"  records: {record_bytes / movie_count:7.1f} bytes/row  "
+                  f"({1 - record_bytes / dict_bytes:.0%} less)")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Compares ORM instances + dict conversion against Core row mappings.
+
+Run from the project root: python -m benchmarks.bench_row_mapping [movie_count]
+"""
+import os
+import sys
+import tempfile
+
+from benchmarks.bench_movie_stats import seed, timed
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def orm_movies(data_manager, user_id):
+    """The read path SQLiteDataManager used before switching to Core."""
+    movies = data_manager.session.query(data_manager.Movie).filter_by(user_id=user_id).all()
+    rows = [{col.name: getattr(movie, col.name) for col in movie.__table__.columns} for movie in movies]
+    data_manager.session.expunge_all()
+    return rows
+
+
+def main():
+    movie_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_manager = SQLiteDataManager(f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        try:
+            data_manager.create_user("bench")
+            seed(data_manager, 1, movie_count)
+
+            orm_time = timed(lambda: orm_movies(data_manager, 1))
+            core_time = timed(lambda: data_manager.get_movies_by_user(1))
+            print(f"{movie_count} movies")
+            print(f"  orm + _convert_to_dict: {orm_time * 1000:8.1f} ms")
+            print(f"  core row mappings:      {core_time * 1000:8.1f} ms  ({orm_time / core_time:.1f}x faster)")
+        finally:
+            data_manager.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+"""Default settings shared by the web app and the command-line interface.
+
+This module must stay free of Flask imports, the command-line interface
+reads it without loading the web stack.
+"""
+import os
+
+# Where Flask puts the instance folder of the app in app.py.
+INSTANCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+# Relative SQLite paths are resolved against INSTANCE_PATH.
+DATABASE_URI = 'sqlite:///movies.db'
@@ -0,0 +1,80 @@
+"""In-process cache of rendered movie card fragments.
+
+A card only depends on its movie row and its template, so rendered cards are
+cached under (movie id, row version, template hash) in a bounded LRU. A page
+of mostly unchanged movies is then assembled from cached strings instead of
+running Jinja once per card.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+DEFAULT_MAXSIZE = 10000
+
+
+class FragmentCache:
+    def __init__(self, jinja_env, maxsize=DEFAULT_MAXSIZE):
+        self._env = jinja_env
+        self.maxsize = maxsize
+        self._fragments = OrderedDict()
+        self._template_hashes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def render_cards(self, template_name, movies):
+        """Returns the rendered card of every movie, as Markup, in order.
+
+        Movies must be dicts with at least 'id' and 'version'. Needs an active
+        request context when the template calls url_for().
+        """
+        return list(self.iter_cards(template_name, movies))
+
+    def iter_cards(self, template_name, movies):
+        """Lazy version of render_cards for streamed responses."""
+        template = self._env.get_template(template_name)
+        template_hash = self._template_hash(template_name, template)
+        for movie in movies:
+            key = (movie['id'], movie['version'], template_hash)
+            card = self.get(key)
+            if card is None:
+                card = Markup(template.render(movie=movie))
+                self.put(key, card)
+            yield card
+
+    def get(self, key):
+        with self._lock:
+            card = self._fragments.get(key)
+            if card is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return card
+
+    def put(self, key, card):
+        with self._lock:
+            self._fragments[key] = card
+            self._fragments.move_to_end(key)
+            while len(self._fragments) > self.maxsize:
+                self._fragments.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def _template_hash(self, template_name, template):
+        # Jinja hands out a new Template object when auto-reload picks up an
+        # edited file, so the hash only has to be recomputed in that case.
+        cached = self._template_hashes.get(template_name)
+        if cached is not None and cached[0] is template:
+            return cached[1]
+        source = self._env.loader.get_source(self._env, template_name)[0]
+        template_hash = hashlib.sha1(source.encode('utf-8')).hexdigest()
+        self._template_hashes[template_name] = (template, template_hash)
+        return template_hash
@@ -0,0 +1,36 @@
+"""Small filesystem helpers shared by the site builder and the asset compressor."""
+import os
+import tempfile
+
+
+def _read_umask():
+    # The umask can only be read by setting it. Done once at import time,
+    # before other threads could create files in between.
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+# mkstemp() creates files readable by their owner only, written files get the
+# mode open() would have given them instead.
+FILE_MODE = 0o666 & ~_read_umask()
+
+
+def atomic_write(path, data):
+    """Writes bytes to path through a temporary file in the same directory.
+
+    The temporary file is renamed over path, so readers see either the old
+    or the new content, never a partially written file. Returns the number
+    of bytes written.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return len(data)
@@ -1,16 +1,56 @@
-import os
-from flask import Flask, url_for
+import sys
+import time
+import config
+from movie_app import MovieApp, create_site_builder
 from storage.sqlite_data_manager import SQLiteDataManager
-from movie_app import MovieApp
 
-def main():
-    app = Flask(__name__)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movies.db'
-    data_manager = SQLiteDataManager(app)
 
-    with app.app_context():
+def open_data_manager():
+    """Opens the web app's database without loading the web app."""
+    return SQLiteDataManager(config.DATABASE_URI, instance_path=config.INSTANCE_PATH)
+
+
+def build_all_websites(data_manager):
+    """Builds every user's showcase site in parallel and reports per-user timings."""
+    from site_builder import build_all_sites
+
+    user_ids = [user['id'] for user in data_manager.get_all_users()]
+    if not user_ids:
+        print("No users found.")
+        return
+
+    builder = create_site_builder(data_manager)
+    start = time.perf_counter()
+    total_bytes = 0
+    for user_id, result, error in build_all_sites(builder, user_ids):
+        if error:
+            print(f"  User {user_id}: failed: {error}")
+            continue
+        total_bytes += result.bytes_written
+        print(f"  User {user_id}: {result.seconds * 1000:.1f} ms, {result.bytes_written} bytes written "
+              f"({result.cards_rendered} cards rendered, {result.cards_reused} unchanged)")
+    print(f"Built {len(user_ids)} sites in {time.perf_counter() - start:.2f} s, {total_bytes} bytes written.")
+
+
+def run_batch(argv):
+    """Runs one of the batch commands in movie_batch.py and returns its exit status."""
+    from movie_batch import build_parser, run
+
+    # Usage errors and --help exit here, before the database is opened.
+    args = build_parser().parse_args(argv)
+    data_manager = open_data_manager()
+    try:
+        return run(data_manager, args)
+    finally:
+        data_manager.close()
+
+
+def main():
+    # Opened when the menu starts, not on import.
+    data_manager = open_data_manager()
+    try:
         while True:
-            choice = input("1. Select existing user\n2. Create new user\nEnter your choice: ")
+            choice = input("1. Select existing user\n2. Create new user\n3. Build all user websites\nEnter your choice: ")
             if choice == '1':
                 users = data_manager.get_all_users()
                 if not users:
@@ -42,8 +82,14 @@ def main():
                     print(f"User '{username}' created successfully.")
                 else:
                     print(f"Error: User '{username}' already exists.")
+            elif choice == '3':
+                build_all_websites(data_manager)
             else:
-                print("Invalid choice. Please enter 1 or 2.")
+                print("Invalid choice. Please enter 1, 2 or 3.")
+    finally:
+        data_manager.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        sys.exit(run_batch(sys.argv[1:]))
+    main()
@@ -1,31 +1,83 @@
-import requests
 import os
-import statistics
-from jinja2 import Environment, FileSystemLoader
 from dotenv import load_dotenv
-import random
-from flask import Flask, url_for
-from app import app
 
-load_dotenv()
+SEARCH_LIMIT = 50
+
+# The OMDb client (requests) and the site builder (Flask, Jinja) are imported
+# by the commands that use them, so starting the menu stays fast.
+
+
+def create_site_builder(data_manager):
+    """Returns a SiteBuilder backed by a web app that shares data_manager."""
+    from app import create_app
+
+    app = create_app({'RESUME_MOVIE_JOBS': False}, data_manager=data_manager)
+    return app.extensions['site_builder']
 
 
 class MovieApp:
     def __init__(self, data_manager, user_id):
         self._data_manager = data_manager
         self.user_id = user_id
+        load_dotenv()
         self.api_key = os.getenv("OMDB_API_KEY")
 
+    # The operations below are shared by the interactive menu and the batch
+    # commands in movie_batch.py, the _command_* methods add the prompts.
+    def iter_movies(self, batch_size=500):
+        return self._data_manager.iter_movies_by_user(self.user_id, batch_size=batch_size)
+
+    def add_titles(self, titles):
+        """Looks titles up concurrently and adds the movies found in one transaction.
+
+        Returns the added movies and (title, error) pairs for the titles that
+        weren't added.
+        """
+        from movie_import import resolve_titles
+
+        movies, failures = resolve_titles(titles)
+        if movies and not self._data_manager.add_movies(self.user_id, movies):
+            failures += [(movie['title'], "Database error") for movie in movies]
+            movies = []
+        return movies, failures
+
+    def delete_movies(self, movie_ids):
+        """Deletes movies of this user in one transaction, returns the deleted ids."""
+        return self._data_manager.delete_movies(self.user_id, movie_ids)
+
+    def movie_stats(self):
+        return self._data_manager.get_user_movie_stats(self.user_id)
+
+    def search(self, search_term, limit=SEARCH_LIMIT):
+        return self._data_manager.search_movies(self.user_id, search_term, limit=limit)
+
+    def sorted_movies(self, descending=False, limit=None):
+        """Returns the movies sorted by rating, optionally only the first limit ones."""
+        return self._data_manager.get_movies_by_user(
+            self.user_id, order_by='-rating' if descending else 'rating', limit=limit)
+
+    def random_movie(self):
+        return self._data_manager.get_random_movie(self.user_id)
+
+    def export(self, out, export_format):
+        """Streams this user's movies to the binary file out.
+
+        A MovieApp created with user_id None, as movie_batch does for an export
+        without --user, streams every user's movies.
+        """
+        from movie_export import export_movies
+
+        return export_movies(self._data_manager, out, export_format, user_id=self.user_id)
+
+    def load(self, lines, import_format):
+        """Imports the movies of an exported CSV or JSON Lines file, see movie_bulk_import."""
+        from movie_bulk_import import import_movies
+
+        return import_movies(self._data_manager, self.user_id, lines, import_format)
+
     def _get_user_movies(self):
         return self._data_manager.get_movies_by_user(self.user_id)
 
-    def _extract_year(self, year_str):
-        try:
-            return int(year_str.split('–')[0])
-        except ValueError:
-            print(f"Invalid year format: {year_str}")
-            return None
-
     def _command_list_movies(self):
         movies = self._get_user_movies()
         if not movies:
@@ -35,11 +87,11 @@ class MovieApp:
             print(f"{movie['title']}: {movie['rating']} ({movie['year']})")
 
     def _fetch_movie_details(self, title):
+        import requests
+        from omdb_client import get_client
+
         try:
-            url = f"http://www.omdbapi.com/?apikey={self.api_key}&t={title}"
-            response = requests.get(url)
-            response.raise_for_status()
-            return response.json()
+            return get_client().fetch_by_title(title)
         except requests.exceptions.RequestException as e:
             print(f"Error: Could not connect to OMDb API: {e}")
             return None
@@ -47,22 +99,10 @@ class MovieApp:
             print(f"Error: Could not decode JSON response: {e}")
             return None
 
-    def _extract_movie_attributes(self, movie_data):
-        try:
-            movie_title = movie_data['Title']
-            year = self._extract_year(movie_data['Year'])
-            if year is None:
-                return None
-            rating = float(movie_data['imdbRating']) if movie_data['imdbRating'] != 'N/A' else 0.0
-            poster_url = movie_data['Poster'] if movie_data['Poster'] != 'N/A' else None
-            imdb_id = movie_data['imdbID']
-            return movie_title, year, rating, poster_url, imdb_id
-        except KeyError as e:
-            print(f"Error: Missing key in OMDb API response: {e}")
-            return None
-
     def _command_add_movie(self):
         """Adds a movie to the storage using the OMDb API."""
+        from omdb_client import parse_movie
+
         title = input("Enter the movie title: ")
         if not self.api_key:
             print("Error: OMDB API key is missing!")
@@ -73,17 +113,43 @@ class MovieApp:
             return
 
         if movie_data['Response'] == 'True':
-            movie_attributes = self._extract_movie_attributes(movie_data)
-            if movie_attributes is None:
+            try:
+                movie = parse_movie(movie_data)
+            except ValueError as e:
+                print(f"Error: {e}")
                 return
 
-            movie_title, year, rating, poster_url, imdb_id = movie_attributes
-            self._data_manager.add_movie(self.user_id, movie_title, movie_data['Director'], year, rating, poster_url,
-                                         imdb_id)
-            print(f"Movie '{movie_title}' added successfully!")
+            self._data_manager.add_movie(self.user_id, movie['title'], movie['director'], movie['year'],
+                                         movie['rating'], movie['poster_url'], movie['imdb_id'])
+            print(f"Movie '{movie['title']}' added successfully!")
         else:
             print(f"Error: {movie_data['Error']}")
 
+    def _command_import_movies(self):
+        """Adds every title of a text or CSV file, looked up concurrently."""
+        from movie_import import read_titles
+
+        path = input("Enter the path of the title list: ")
+        if not self.api_key:
+            print("Error: OMDB API key is missing!")
+            return
+
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                titles = read_titles(f)
+        except OSError as e:
+            print(f"Error: Could not read {path}: {e}")
+            return
+        if not titles:
+            print("No titles found.")
+            return
+
+        print(f"Looking up {len(titles)} titles...")
+        movies, failures = self.add_titles(titles)
+        print(f"{len(movies)} movies imported.")
+        for title, error in failures:
+            print(f"  Skipped '{title}': {error}")
+
     def _command_delete_movie(self):
         try:
             movie_id = int(input("Enter movie ID to delete: "))
@@ -93,48 +159,37 @@ class MovieApp:
             print("Invalid input. Please enter a valid movie ID (integer).")
 
     def _command_movie_stats(self):
-        movies = self._get_user_movies()
-        if not movies:
+        stats = self.movie_stats()
+        if not stats or not stats['rated_count']:
             print("No movies to calculate stats.")
             return
 
-        try:
-            ratings = [movie['rating'] for movie in movies]
-            avg_rating = sum(ratings) / len(ratings)
-            median_rating = statistics.median(ratings)
-            best_movie = max(movies, key=lambda movie: movie['rating'])
-            worst_movie = min(movies, key=lambda movie: movie['rating'])
-
-            print("\nMovie Stats:")
-            print(f"  Average rating: {avg_rating:.2f}")
-            print(f"  Median rating: {median_rating}")
-            print(f"  Best movie: {best_movie['title']}, {best_movie['rating']}")
-            print(f"  Worst movie: {worst_movie['title']}, {worst_movie['rating']}")
-        except (ValueError, TypeError, statistics.StatisticsError) as e:
-            print(f"Error calculating movie stats: {e}")
+        print("\nMovie Stats:")
+        print(f"  Average rating: {stats['average']:.2f}")
+        print(f"  Median rating: {stats['median']}")
+        print(f"  Best movie: {stats['best']['title']}, {stats['best']['rating']}")
+        print(f"  Worst movie: {stats['worst']['title']}, {stats['worst']['rating']}")
 
     def _command_generate_website(self):
         try:
-            # Trigger the Flask route for website generation
-            response = requests.get(f'http://localhost:5000/generate_website/{self.user_id}')
-            print("Website generated succesfully!")
-
-        except requests.exceptions.RequestException as e:
+            builder = create_site_builder(self._data_manager)
+            result = builder.build_user_site(self.user_id)
+            print(f"Website generated successfully in {builder.site_dir(self.user_id)} "
+                  f"({result.cards_rendered} cards rendered, {result.cards_reused} unchanged).")
+        except OSError as e:
             print(f"An error occurred: {e}")
 
     def _command_random_movie(self):
-        movies = self._get_user_movies()
-        if not movies:
+        random_movie = self.random_movie()
+        if not random_movie:
             print("No movies in the database.")
             return
 
-        random_movie = random.choice(movies)
         print(f"Your movie for tonight: {random_movie['title']}, it's rated {random_movie['rating']}")
 
     def _command_search_movie(self):
-        search_term = input("Enter search term: ").lower()
-        movies = self._get_user_movies()
-        found_movies = [movie for movie in movies if search_term in movie['title'].lower()]
+        search_term = input("Enter search term: ")
+        found_movies = self.search(search_term)
         if found_movies:
             print("Found movies:")
             for movie in found_movies:
@@ -143,23 +198,26 @@ class MovieApp:
             print("No movies found.")
 
     def _command_sort_movies(self):
-        movies = self._get_user_movies()
-        if not movies:
+        order = input("Sort order (A/D): ").upper()
+        if order not in ('A', 'D'):
+            print("Invalid order. Using ascending order.")
+            order = 'A'
+
+        count = input("How many movies (Enter for all): ").strip()
+        try:
+            limit = int(count) if count else None
+        except ValueError:
+            print("Invalid number. Showing all movies.")
+            limit = None
+
+        sorted_movies = self.sorted_movies(descending=order == 'D', limit=limit)
+        if not sorted_movies:
             print("No movies to sort.")
             return
 
-        try:
-            order = input("Sort order (A/D): ").upper()
-            if order not in ('A', 'D'):
-                print("Invalid order. Using ascending order.")
-                order = 'A'
-
-            sorted_movies = sorted(movies, key=lambda movie: movie['rating'], reverse=(order == 'D'))
-            print("Sorted movies:")
-            for movie in sorted_movies:
-                print(f"{movie['title']}: {movie['rating']} ({movie['year']})")
-        except (TypeError, KeyError) as e:
-            print(f"Error sorting movies: {e}")
+        print("Sorted movies:")
+        for movie in sorted_movies:
+            print(f"{movie['title']}: {movie['rating']} ({movie['year']})")
 
     def _command_add_user(self):
         name = input("Enter new username: ")
@@ -181,9 +239,10 @@ class MovieApp:
                 print("7. Search movie")
                 print("8. Movies sorted by rating")
                 print("9. Add user")
+                print("10. Import movies from file")
                 print("0. Exit")
 
-                choice = input("Enter your choice (0-9): ")
+                choice = input("Enter your choice (0-10): ")
                 if choice == "1":
                     self._command_list_movies()
                 elif choice == "2":
@@ -202,6 +261,8 @@ class MovieApp:
                     self._command_sort_movies()
                 elif choice == "9":
                     self._command_add_user()
+                elif choice == "10":
+                    self._command_import_movies()
                 elif choice == "0":
                     print("Exiting the movie app.")
                     break
@@ -0,0 +1,191 @@
+"""Non-interactive command-line interface for scripted and bulk work.
+
+    python main.py <command> --user ID [options]
+
+Results are written to stdout as JSON lines, export can also write CSV or
+Parquet. Commands that take many inputs (titles, movie ids, search terms)
+read them from the arguments, or with --file from a file or stdin ('-'), and
+handle all of them in one process. Adds and deletes are committed in a
+single transaction.
+"""
+import argparse
+import json
+import sys
+
+from movie_app import MovieApp
+
+
+def _write(out, value):
+    out.write(json.dumps(value, default=str, ensure_ascii=False) + '\n')
+
+
+def _read_lines(path, stdin):
+    if path == '-':
+        return stdin.read().splitlines()
+    with open(path, encoding='utf-8-sig') as f:
+        return f.read().splitlines()
+
+
+def _inputs(args, stdin):
+    """The command's inputs: its arguments followed by the non-blank lines of --file."""
+    values = list(args.values)
+    if args.file:
+        values += [line.strip() for line in _read_lines(args.file, stdin) if line.strip()]
+    return values
+
+
+def _command_list(movie_app, args, stdin, out):
+    for movie in movie_app.iter_movies():
+        _write(out, {name: movie[name] for name in ('id', 'title', 'rating', 'year')})
+    return 0
+
+
+def _command_add(movie_app, args, stdin, out):
+    from movie_import import read_titles
+
+    if not movie_app.api_key:
+        print("Error: OMDB API key is missing!", file=sys.stderr)
+        return 1
+    titles = list(args.values)
+    if args.file:
+        # The file may also be a CSV with a "title" column, like the menu's import.
+        titles += read_titles(_read_lines(args.file, stdin))
+    movies, failures = movie_app.add_titles(titles)
+    for movie in movies:
+        _write(out, {'title': movie['title'], 'added': True, 'movie': movie})
+    for title, error in failures:
+        _write(out, {'title': title, 'added': False, 'error': error})
+    return 1 if failures else 0
+
+
+def _command_delete(movie_app, args, stdin, out):
+    try:
+        movie_ids = [int(value) for value in _inputs(args, stdin)]
+    except ValueError as e:
+        print(f"Error: invalid movie ID: {e}", file=sys.stderr)
+        return 1
+    deleted = set(movie_app.delete_movies(movie_ids))
+    for movie_id in movie_ids:
+        _write(out, {'id': movie_id, 'deleted': movie_id in deleted})
+    return 0 if deleted.issuperset(movie_ids) else 1
+
+
+def _command_stats(movie_app, args, stdin, out):
+    # null when the user has no movies.
+    _write(out, movie_app.movie_stats())
+    return 0
+
+
+def _command_search(movie_app, args, stdin, out):
+    for query in _inputs(args, stdin):
+        movies = movie_app.search(query, limit=args.limit)
+        _write(out, {'query': query, 'movies': [movie.to_dict() for movie in movies]})
+    return 0
+
+
+def _command_sort(movie_app, args, stdin, out):
+    for movie in movie_app.sorted_movies(descending=args.desc, limit=args.limit):
+        _write(out, movie.to_dict())
+    return 0
+
+
+def _command_random(movie_app, args, stdin, out):
+    for _ in range(args.count):
+        movie = movie_app.random_movie()
+        if movie is None:
+            return 1
+        _write(out, movie.to_dict())
+    return 0
+
+
+def _command_export(movie_app, args, stdin, out):
+    if args.output == '-':
+        out.flush()
+        # The export is bytes (Parquet is binary), write past the text layer.
+        movie_app.export(getattr(out, 'buffer', out), args.format)
+        return 0
+    with open(args.output, 'wb') as f:
+        movie_app.export(f, args.format)
+    return 0
+
+
+def _import(movie_app, lines, import_format, out):
+    result = movie_app.load(lines, import_format)
+    for line_number, error in result.errors:
+        _write(out, {'line': line_number, 'error': error})
+    _write(out, {'imported': result.imported, 'rejected': result.rejected, 'error': result.failure})
+    return 1 if result.rejected or result.failure else 0
+
+
+def _command_import(movie_app, args, stdin, out):
+    from movie_bulk_import import detect_format
+
+    import_format = args.format or detect_format(args.path)
+    if args.path == '-':
+        return _import(movie_app, stdin, import_format, out)
+    with open(args.path, newline='', encoding='utf-8-sig') as f:
+        return _import(movie_app, f, import_format, out)
+
+
+def build_parser():
+    user = argparse.ArgumentParser(add_help=False)
+    user.add_argument('--user', type=int, required=True, help="ID of the user to work on")
+    bulk = argparse.ArgumentParser(add_help=False)
+    bulk.add_argument('--file', help="read more inputs from this file, one per line, '-' for stdin")
+
+    parser = argparse.ArgumentParser(prog='main.py', description="Movie app batch commands, output is JSON lines.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', parents=[user], help="list the user's movies").set_defaults(run=_command_list)
+
+    add = commands.add_parser('add', parents=[user, bulk], help="look titles up on OMDb and add them")
+    add.add_argument('values', nargs='*', metavar='TITLE')
+    add.set_defaults(run=_command_add)
+
+    delete = commands.add_parser('delete', parents=[user, bulk], help="delete movies by ID")
+    delete.add_argument('values', nargs='*', metavar='MOVIE_ID')
+    delete.set_defaults(run=_command_delete)
+
+    commands.add_parser('stats', parents=[user], help="rating statistics").set_defaults(run=_command_stats)
+
+    search = commands.add_parser('search', parents=[user, bulk], help="full-text search, one result line per query")
+    search.add_argument('values', nargs='*', metavar='QUERY')
+    search.add_argument('--limit', type=int, default=20)
+    search.set_defaults(run=_command_search)
+
+    sort = commands.add_parser('sort', parents=[user], help="movies sorted by rating")
+    sort.add_argument('--desc', action='store_true', help="best rated first")
+    sort.add_argument('--limit', type=int)
+    sort.set_defaults(run=_command_sort)
+
+    random_movie = commands.add_parser('random', parents=[user], help="random movie suggestions")
+    random_movie.add_argument('--count', type=int, default=1)
+    random_movie.set_defaults(run=_command_random)
+
+    export = commands.add_parser('export', help="stream movies to CSV, JSON Lines or Parquet")
+    export.add_argument('--user', type=int, help="ID of the user to export, every user's movies if left out")
+    export.add_argument('--format', choices=['csv', 'jsonl', 'parquet'], default='jsonl',
+                        help="parquet needs the optional pyarrow package")
+    export.add_argument('--output', default='-', help="file to write, '-' for stdout")
+    export.set_defaults(run=_command_export)
+
+    load = commands.add_parser('import', parents=[user],
+                               help="load an exported CSV or JSON Lines file, without OMDb lookups")
+    load.add_argument('path', help="file to load, '-' for stdin")
+    load.add_argument('--format', choices=['csv', 'jsonl'],
+                      help="format of the file, guessed from its extension if left out")
+    load.set_defaults(run=_command_import)
+    return parser
+
+
+def run(data_manager, args, stdin=None, stdout=None):
+    """Runs a batch command parsed by build_parser() and returns the exit status."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    if args.user is not None and data_manager.get_user_by_id(args.user) is None:
+        print(f"Error: user {args.user} not found", file=sys.stderr)
+        return 2
+    try:
+        return args.run(MovieApp(data_manager, args.user), args, stdin, stdout)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
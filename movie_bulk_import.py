@@ -0,0 +1,164 @@
+"""Bulk import of exported movie collections.
+
+Loads CSV or JSON Lines files like the ones movie_export writes into a
+user's collection, without any OMDb lookups. Rows are streamed from the file
+and validated, and the valid ones are inserted in large batches, one
+transaction per batch (see SQLiteDataManager.load_movies), so a file of any
+size is loaded in constant memory. Ids and user ids in the file are ignored:
+every row becomes a new movie of the target user.
+"""
+import csv
+import json
+import math
+import re
+from collections import namedtuple
+
+import sqlalchemy
+
+from storage.models import Movie
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Rejected rows are counted, but only the first ones are reported.
+MAX_REPORTED_ERRORS = 100
+IMDB_ID_PATTERN = re.compile(r'tt\d+')
+# SQLite stores integers in 64 bits, sqlite3 raises OverflowError for anything outside.
+SQLITE_INTEGER_RANGE = (-2 ** 63, 2 ** 63 - 1)
+
+ImportResult = namedtuple('ImportResult', ['imported', 'rejected', 'errors', 'failure'])
+
+
+def detect_format(path):
+    """Guesses the import format from a file name."""
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise ValueError(f"Can't tell the format of {path!r}, pass it explicitly")
+
+
+def _text(row, column, required=False):
+    value = row.get(column)
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f"{column} is required")
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{column} must be text, not {value!r}")
+    value = value.strip()
+    max_length = Movie.__table__.c[column].type.length
+    if len(value) > max_length:
+        raise ValueError(f"{column} is longer than {max_length} characters")
+    return value
+
+
+def _number(row, column, convert):
+    value = row.get(column)
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{column} must be a number, not {value!r}")
+    try:
+        number = convert(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"{column} must be a number, not {value!r}") from None
+    if isinstance(number, float) and not math.isfinite(number):
+        raise ValueError(f"{column} must be a finite number, not {value!r}")
+    if isinstance(number, int) and not SQLITE_INTEGER_RANGE[0] <= number <= SQLITE_INTEGER_RANGE[1]:
+        raise ValueError(f"{column} is out of range: {value!r}")
+    return number
+
+
+def validate_movie(row):
+    """Returns the add_movie columns of a file row, raises ValueError if it isn't a valid movie."""
+    movie = {
+        'title': _text(row, 'title', required=True),
+        'director': _text(row, 'director'),
+        'year': _number(row, 'year', int),
+        'rating': _number(row, 'rating', float),
+        'poster_url': _text(row, 'poster_url'),
+        'imdb_id': _text(row, 'imdb_id'),
+    }
+    if movie['rating'] is not None and not 0 <= movie['rating'] <= 10:
+        raise ValueError(f"rating must be between 0 and 10, not {movie['rating']}")
+    if movie['imdb_id'] is not None and not IMDB_ID_PATTERN.fullmatch(movie['imdb_id']):
+        raise ValueError(f"imdb_id must look like 'tt0111161', not {movie['imdb_id']!r}")
+    return movie
+
+
+def _rows(lines, import_format):
+    """Yields (line number, row dict or None, error message or None) for every record of a file."""
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        if reader.fieldnames is None or 'title' not in reader.fieldnames:
+            raise ValueError("The CSV file has no 'title' column")
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, None, "not a JSON object"
+
+
+def import_movies(data_manager, user_id, lines, import_format, batch_size=IMPORT_BATCH_SIZE):
+    """Validates and inserts the movies of a CSV or JSON Lines file for a user.
+
+    lines is the open file (or any iterable of lines). Returns an
+    ImportResult with the number of movies imported and rejected, and
+    (line number, error) pairs for the first rejected rows. A database error
+    stops the import, failure then says from which line on the file was not
+    imported, otherwise it is None.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {import_format!r}")
+    errors = []
+    rejected = 0
+    imported = 0
+    # Line of the first row of the batch being inserted.
+    batch_line = None
+
+    def batches():
+        nonlocal rejected, imported, batch_line
+        batch = []
+        for line_number, row, error in _rows(lines, import_format):
+            if error is None:
+                try:
+                    movie = validate_movie(row)
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((line_number, error))
+                continue
+            if not batch:
+                first_line = line_number
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                batch_line = first_line
+                yield batch
+                # load_movies only asks for the next batch once this one is committed.
+                imported += len(batch)
+                batch = []
+        if batch:
+            batch_line = first_line
+            yield batch
+            imported += len(batch)
+
+    try:
+        data_manager.load_movies(user_id, batches())
+    except (sqlalchemy.exc.SQLAlchemyError, OverflowError) as e:
+        # sqlite3 raises OverflowError for integers it can't store, SQLAlchemy doesn't wrap it.
+        error = getattr(e, 'orig', None) or e
+        failure = f"Database error, nothing from line {batch_line} on was imported: {error}"
+        return ImportResult(imported, rejected, errors, failure)
+    return ImportResult(imported, rejected, errors, None)
@@ -0,0 +1,154 @@
+"""Streaming export of movie collections.
+
+Movies are read from one open cursor in fixed-size batches and every batch is
+encoded and handed on before the next one is read, so an export takes the
+same memory for ten movies as for ten million. CSV and JSON Lines are always
+available, Parquet (one row group per batch) when the optional pyarrow
+package is installed.
+"""
+import csv
+import io
+import json
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow is optional, CSV and JSON Lines work without it
+    pyarrow = None
+
+EXPORT_BATCH_SIZE = 1000
+# Everything needed to load the movies into another instance, the row version is internal.
+EXPORT_COLUMNS = ('id', 'user_id', 'title', 'director', 'year', 'rating', 'poster_url', 'imdb_id')
+# Format name -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', '.csv'),
+    'jsonl': ('application/x-ndjson', '.jsonl'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+
+
+class _CsvEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def encode(self, movies):
+        self._writer.writerows([movie[column] for column in EXPORT_COLUMNS] for movie in movies)
+        return self._drain()
+
+    def finish(self):
+        return self._drain()
+
+    def _drain(self):
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode('utf-8')
+
+
+class _JsonLinesEncoder:
+    def encode(self, movies):
+        lines = (json.dumps({column: movie[column] for column in EXPORT_COLUMNS}, ensure_ascii=False)
+                 for movie in movies)
+        return ''.join(line + '\n' for line in lines).encode('utf-8')
+
+    def finish(self):
+        return b''
+
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only file that hands out what was written since the last drain().
+
+    The Parquet writer needs a file to write to, this one lets the encoded
+    row groups be streamed out without a temporary file.
+    """
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class _ParquetEncoder:
+    def __init__(self):
+        self._schema = pyarrow.schema([
+            ('id', pyarrow.int64()),
+            ('user_id', pyarrow.int64()),
+            ('title', pyarrow.string()),
+            ('director', pyarrow.string()),
+            ('year', pyarrow.int64()),
+            ('rating', pyarrow.float64()),
+            ('poster_url', pyarrow.string()),
+            ('imdb_id', pyarrow.string()),
+        ])
+        self._sink = _ChunkSink()
+        self._writer = pyarrow.parquet.ParquetWriter(self._sink, self._schema)
+
+    def encode(self, movies):
+        columns = {column: [movie[column] for movie in movies] for column in EXPORT_COLUMNS}
+        self._writer.write_table(pyarrow.Table.from_pydict(columns, schema=self._schema))
+        return self._sink.drain()
+
+    def finish(self):
+        self._writer.close()
+        return self._sink.drain()
+
+
+def available_formats():
+    return [name for name in EXPORT_FORMATS if name != 'parquet' or pyarrow is not None]
+
+
+def _encoder(export_format):
+    if export_format not in available_formats():
+        raise ValueError(f"Unsupported export format: {export_format!r}")
+    if export_format == 'csv':
+        return _CsvEncoder()
+    if export_format == 'jsonl':
+        return _JsonLinesEncoder()
+    return _ParquetEncoder()
+
+
+def iter_export(data_manager, export_format, user_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Returns an iterator over the encoded export as chunks of bytes, one per batch.
+
+    user_id None exports every user's movies. An unknown or unavailable
+    format raises ValueError right away, not on first iteration.
+    """
+    encoder = _encoder(export_format)
+    return _encode_batches(encoder, data_manager.stream_movie_batches(user_id, batch_size=batch_size))
+
+
+def _encode_batches(encoder, batches):
+    try:
+        for movies in batches:
+            yield encoder.encode(movies)
+        tail = encoder.finish()
+        if tail:
+            yield tail
+    finally:
+        batches.close()
+
+
+def export_movies(data_manager, out, export_format, user_id=None, batch_size=EXPORT_BATCH_SIZE):
+    """Writes an export to the binary file out, returns the number of bytes written."""
+    bytes_written = 0
+    for chunk in iter_export(data_manager, export_format, user_id=user_id, batch_size=batch_size):
+        out.write(chunk)
+        bytes_written += len(chunk)
+    return bytes_written
@@ -0,0 +1,65 @@
+"""Bulk import of movies from a list of titles.
+
+Titles are read from plain text (one per line) or CSV (a "title" column, or
+the first column). The CLI looks them up concurrently through a bounded pool
+of OMDb requests and inserts the resolved movies in a single transaction,
+the web app queues one background job per title instead (see movie_jobs).
+"""
+import csv
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from omdb_cache import normalize_title
+from omdb_client import get_client, parse_movie
+
+# Stays below the OMDb client's connection pool size so no request waits on a socket.
+MAX_IMPORT_WORKERS = 8
+
+
+def read_titles(lines):
+    """Returns the distinct movie titles of a text or CSV title list."""
+    titles = []
+    seen = set()
+    title_column = 0
+    for row_number, row in enumerate(csv.reader(lines)):
+        cells = [cell.strip() for cell in row]
+        if row_number == 0 and 'title' in (cell.casefold() for cell in cells):
+            title_column = [cell.casefold() for cell in cells].index('title')
+            continue
+        if len(cells) <= title_column or not cells[title_column]:
+            continue
+        title = cells[title_column]
+        if normalize_title(title) not in seen:
+            seen.add(normalize_title(title))
+            titles.append(title)
+    return titles
+
+
+def _resolve_title(client, title):
+    try:
+        movie_data = client.fetch_by_title(title)
+        if movie_data.get('Response') != 'True':
+            return None, movie_data.get('Error', "Movie not found!")
+        return parse_movie(movie_data), None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return None, str(e)
+
+
+def resolve_titles(titles, client=None, max_workers=MAX_IMPORT_WORKERS):
+    """Looks titles up concurrently.
+
+    Returns the parsed movies and a list of (title, error) pairs for the
+    titles that couldn't be resolved, both in input order.
+    """
+    client = client or get_client()
+    movies = []
+    failures = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='movie-import') as executor:
+        results = executor.map(lambda title: _resolve_title(client, title), titles)
+        for title, (movie, error) in zip(titles, results):
+            if movie is None:
+                failures.append((title, error))
+            else:
+                movies.append(movie)
+    return movies, failures
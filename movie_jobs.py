@@ -0,0 +1,73 @@
+"""Background worker pool for the web app's add-movie pipeline.
+
+Adding a movie (or importing a title list, one job per title) only stores a
+job and returns, a thread pool then resolves the title against OMDb and
+inserts the movie, so web workers never wait on outbound HTTP. Jobs live in
+the database, so jobs left unfinished when the process stopped are picked up
+again on the next start.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from omdb_client import get_client, parse_movie
+
+DEFAULT_WORKERS = 4
+# A job still "running" after this long belongs to a worker that died.
+STALE_JOB_SECONDS = 10 * 60
+
+
+class MovieJobQueue:
+    def __init__(self, app, data_manager, max_workers=DEFAULT_WORKERS):
+        self._app = app
+        self._data_manager = data_manager
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='movie-job')
+
+    def enqueue(self, user_id, title):
+        """Stores an add-movie job, schedules it and returns the job id."""
+        job_id = self._data_manager.create_job(user_id, title)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def enqueue_many(self, user_id, titles):
+        """Stores an add-movie job per title, schedules them and returns the job ids."""
+        job_ids = self._data_manager.create_jobs(user_id, titles)
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+        return job_ids
+
+    def resume_unfinished(self):
+        """Schedules jobs left pending or running by a previous process.
+
+        The workers that were running jobs died with that process, so those
+        jobs are put back to pending first, claim_job would otherwise refuse
+        them until they are stale. When several processes share a database,
+        only one of them should resume jobs (the RESUME_MOVIE_JOBS setting).
+        """
+        with self._app.app_context():
+            self._data_manager.requeue_running_jobs()
+            job_ids = self._data_manager.get_unfinished_job_ids()
+        for job_id in job_ids:
+            self._executor.submit(self._run, job_id)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job_id):
+        with self._app.app_context():
+            if not self._data_manager.claim_job(job_id, STALE_JOB_SECONDS):
+                return
+            job = self._data_manager.get_job(job_id)
+            try:
+                movie_data = get_client().fetch_by_title(job['title'])
+                if movie_data.get('Response') != 'True':
+                    self._data_manager.finish_job(job_id, error=movie_data.get('Error', "Movie not found!"))
+                    return
+                movie = parse_movie(movie_data)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._data_manager.finish_job(job_id, error=f"Error fetching movie details from OMDb API: {e}")
+                return
+            except Exception as e:  # Never leave a job stuck in "running"
+                self._data_manager.finish_job(job_id, error=f"An error occurred: {e}")
+                return
+            self._data_manager.finish_job(job_id, movie=movie)
@@ -0,0 +1,118 @@
+"""Persistent cache for OMDb responses.
+
+Responses are stored in a small SQLite database of their own, keyed by the
+normalized title that was looked up and by imdbID. Entries expire after a
+TTL, the least recently used entries are evicted once the cache grows past
+``max_entries``, and "Movie not found!" answers are cached for a shorter
+time so typos don't cost an API call every time either.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_NEGATIVE_TTL = 60 * 60
+DEFAULT_MAX_ENTRIES = 10000
+NOT_FOUND_ERROR = 'Movie not found!'
+
+
+def normalize_title(title):
+    return ' '.join(title.casefold().split())
+
+
+def _title_key(title):
+    return f"t:{normalize_title(title)}"
+
+
+def _imdb_key(imdb_id):
+    return f"i:{imdb_id}"
+
+
+class OMDbCache:
+    def __init__(self, path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Losing the newest cache entries in a crash is harmless, so don't pay for fsyncs.
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = OFF")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS omdb_cache ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_omdb_cache_last_access ON omdb_cache (last_access)")
+
+    def get_by_title(self, title):
+        return self._get(_title_key(title))
+
+    def get_by_imdb_id(self, imdb_id):
+        return self._get(_imdb_key(imdb_id))
+
+    def put(self, response, title=None):
+        """Caches an OMDb response under the looked up title and its imdbID.
+
+        Successful responses and "Movie not found!" answers are cached, other
+        errors (bad API key, request limit reached, ...) are not.
+        """
+        if response.get('Response') == 'True':
+            ttl = self.ttl
+        elif response.get('Error') == NOT_FOUND_ERROR:
+            ttl = self.negative_ttl
+        else:
+            return
+
+        keys = []
+        if title:
+            keys.append(_title_key(title))
+        if response.get('imdbID'):
+            keys.append(_imdb_key(response['imdbID']))
+        if not keys:
+            return
+
+        now = time.time()
+        payload = json.dumps(response)
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO omdb_cache (key, response, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                [(key, payload, now + ttl, now) for key in keys])
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute("DELETE FROM omdb_cache")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, expires_at FROM omdb_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, expires_at = row
+            if expires_at <= now:
+                self._connection.execute("DELETE FROM omdb_cache WHERE key = ?", (key,))
+                return None
+            self._connection.execute("UPDATE omdb_cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(response)
+
+    def _evict(self):
+        (count,) = self._connection.execute("SELECT COUNT(*) FROM omdb_cache").fetchone()
+        if count <= self.max_entries:
+            return
+        self._connection.execute("DELETE FROM omdb_cache WHERE expires_at <= ?", (time.time(),))
+        self._connection.execute(
+            "DELETE FROM omdb_cache WHERE key IN "
+            "(SELECT key FROM omdb_cache ORDER BY last_access LIMIT "
+            "max(0, (SELECT COUNT(*) FROM omdb_cache) - ?))",
+            (self.max_entries,))
@@ -0,0 +1,120 @@
+"""Shared OMDb API client used by the web app and the CLI.
+
+All lookups go through one keep-alive ``requests.Session`` so repeated adds
+reuse pooled connections, every request has connect/read timeouts, and
+transient failures are retried with bounded exponential backoff. Answers
+are served from an ``OMDbCache`` first when one is configured.
+"""
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from omdb_cache import OMDbCache
+
+OMDB_URL = 'http://www.omdbapi.com/'
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'omdb_cache.db')
+
+# (connect, read) timeouts in seconds.
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_POOL_SIZE = 10
+
+
+def parse_movie(movie_data):
+    """Maps a successful OMDb response to Movie column values.
+
+    Raises ValueError when the response lacks a field or has one that can't
+    be parsed.
+    """
+    try:
+        year = int(movie_data['Year'].split('–')[0])
+        rating = float(movie_data['imdbRating']) if movie_data['imdbRating'] != 'N/A' else 0.0
+        return {
+            'title': movie_data['Title'],
+            'director': movie_data['Director'] if movie_data.get('Director') != 'N/A' else None,
+            'year': year,
+            'rating': rating,
+            'poster_url': movie_data['Poster'] if movie_data.get('Poster') != 'N/A' else None,
+            'imdb_id': movie_data['imdbID'],
+        }
+    except KeyError as e:
+        raise ValueError(f"Missing key in OMDb API response: {e}") from e
+
+
+class OMDbClient:
+    def __init__(self, api_key, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff_factor=DEFAULT_BACKOFF_FACTOR, pool_size=DEFAULT_POOL_SIZE, cache=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.cache = cache
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self._session = requests.Session()
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def fetch_by_title(self, title):
+        """Returns the decoded OMDb response for a movie title.
+
+        Raises requests.exceptions.RequestException when OMDb can't be reached
+        or answers with an error status, and ValueError for invalid JSON.
+        """
+        if self.cache is not None:
+            cached = self.cache.get_by_title(title)
+            if cached is not None:
+                return cached
+        movie_data = self._get({'t': title})
+        if self.cache is not None:
+            self.cache.put(movie_data, title=title)
+        return movie_data
+
+    def fetch_by_imdb_id(self, imdb_id):
+        """Returns the decoded OMDb response for an imdbID, see fetch_by_title."""
+        if self.cache is not None:
+            cached = self.cache.get_by_imdb_id(imdb_id)
+            if cached is not None:
+                return cached
+        movie_data = self._get({'i': imdb_id})
+        if self.cache is not None:
+            self.cache.put(movie_data)
+        return movie_data
+
+    def _get(self, params):
+        response = self._session.get(OMDB_URL, params={**params, 'apikey': self.api_key}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self._session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide OMDb client.
+
+    It is configured from OMDB_API_KEY and caches responses in
+    OMDB_CACHE_PATH (instance/omdb_cache.db by default).
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            cache = OMDbCache(os.getenv('OMDB_CACHE_PATH', DEFAULT_CACHE_PATH))
+            _client = OMDbClient(os.getenv('OMDB_API_KEY'), cache=cache)
+        return _client
@@ -0,0 +1,79 @@
+"""Precompressed static files.
+
+HTML and CSS files get .gz (and, when the optional brotli package is
+installed, .br) siblings written next to them once, and send_precompressed()
+serves the best sibling the client accepts instead of compressing on every
+request.
+"""
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+
+from fs_utils import atomic_write
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip alone still cuts most of the transfer
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.css')
+
+
+def _compressors():
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.append(('.br', lambda data: brotli.compress(data, mode=brotli.MODE_TEXT)))
+    return compressors
+
+
+def _is_fresh(compressed_path, source_path):
+    try:
+        return os.path.getmtime(compressed_path) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def compress_file(path):
+    """Writes the compressed siblings of path that are missing or stale.
+
+    Returns the number of bytes written.
+    """
+    bytes_written = 0
+    data = None
+    for extension, compress in _compressors():
+        compressed_path = path + extension
+        if _is_fresh(compressed_path, path):
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        bytes_written += atomic_write(compressed_path, compress(data))
+    return bytes_written
+
+
+def compress_directory(directory, extensions=COMPRESSIBLE_EXTENSIONS):
+    """Precompresses every file with one of the given extensions below directory."""
+    bytes_written = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(extensions):
+                bytes_written += compress_file(os.path.join(root, filename))
+    return bytes_written
+
+
+def send_precompressed(directory, filename):
+    """Sends directory/filename, or its .br/.gz sibling if the client accepts it."""
+    path = os.path.join(directory, filename)
+    candidates = [('br', '.br'), ('gzip', '.gz')] if brotli is not None else [('gzip', '.gz')]
+    for encoding, extension in candidates:
+        if request.accept_encodings[encoding] and _is_fresh(path + extension, path):
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(directory, filename + extension, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename)
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,181 @@
+"""Incremental static site builder for the users' movie showcase pages.
+
+Every user gets an output directory of their own (instance/sites/<user_id>/).
+Each movie card is rendered to a fragment file, and a manifest remembers the
+content hash every fragment was rendered from, so a rebuild only renders
+the cards of movies that changed and only rewrites the page when its
+content changed. Files are written to a temporary file and renamed into
+place, so readers never see a half-written page, and the page is stored
+precompressed next to the original.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from markupsafe import Markup
+
+from fs_utils import atomic_write
+from precompress import compress_file
+
+PAGE_TEMPLATE = 'index_template.html'
+CARD_TEMPLATE = '_showcase_card.html'
+PAGE_FILENAME = 'index.html'
+MANIFEST_FILENAME = 'manifest.json'
+CARDS_DIRNAME = 'cards'
+SITE_TITLE = "My Movie App"
+MOVIE_BATCH_SIZE = 500
+
+BuildResult = namedtuple('BuildResult', ['user_id', 'cards_rendered', 'cards_reused', 'page_written',
+                                         'bytes_written', 'seconds'])
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class SiteBuilder:
+    def __init__(self, app, data_manager, output_root=None, fragment_cache=None):
+        self._app = app
+        self._data_manager = data_manager
+        self._fragment_cache = fragment_cache
+        self.output_root = output_root or os.path.join(app.instance_path, 'sites')
+
+    def site_dir(self, user_id):
+        return os.path.join(self.output_root, str(int(user_id)))
+
+    def build_user_site(self, user_id, batch_size=MOVIE_BATCH_SIZE):
+        """Brings a user's showcase page up to date and returns a BuildResult.
+
+        Movies are streamed from the database batch_size rows at a time.
+        """
+        with self._app.app_context():
+            return self.build(user_id, self._data_manager.iter_movies_by_user(user_id, batch_size=batch_size))
+
+    def build(self, user_id, movies):
+        """Builds the showcase page of user_id from an iterable of movie records."""
+        start = time.perf_counter()
+        site_dir = self.site_dir(user_id)
+        cards_dir = os.path.join(site_dir, CARDS_DIRNAME)
+        os.makedirs(cards_dir, exist_ok=True)
+
+        manifest = self._load_manifest(site_dir)
+        template_hash = self._template_hash()
+        previous_cards = manifest.get('cards', {})
+        # A template change invalidates every rendered fragment.
+        old_cards = previous_cards if manifest.get('template_hash') == template_hash else {}
+
+        env = self._app.jinja_env
+        card_template = env.get_template(CARD_TEMPLATE)
+        cards = []
+        new_cards = {}
+        cards_rendered = cards_reused = bytes_written = 0
+        # url_for() needs a request context to build the card and page links.
+        with self._app.test_request_context('/'):
+            for movie in movies:
+                movie_key = str(movie['id'])
+                content_hash = _sha256(json.dumps(movie.to_dict(), sort_keys=True, default=str))
+                card_path = os.path.join(cards_dir, f"{movie_key}.html")
+                card = None
+                if old_cards.get(movie_key) == content_hash:
+                    card = self._read_card(card_path)
+                if card is None:
+                    card = self._render_card(card_template, movie)
+                    bytes_written += atomic_write(card_path, card.encode('utf-8'))
+                    cards_rendered += 1
+                else:
+                    cards_reused += 1
+                new_cards[movie_key] = content_hash
+                cards.append(Markup(card))
+
+            page_hash = _sha256(template_hash + ''.join(new_cards.values()))
+            page_path = os.path.join(site_dir, PAGE_FILENAME)
+            page_written = manifest.get('page_hash') != page_hash or not os.path.exists(page_path)
+            if page_written:
+                html = env.get_template(PAGE_TEMPLATE).render(title=SITE_TITLE, cards=cards)
+                bytes_written += atomic_write(page_path, html.encode('utf-8'))
+                bytes_written += compress_file(page_path)
+
+        for movie_key in previous_cards.keys() - new_cards.keys():
+            try:
+                os.remove(os.path.join(cards_dir, f"{movie_key}.html"))
+            except FileNotFoundError:
+                pass
+
+        new_manifest = {'template_hash': template_hash, 'page_hash': page_hash, 'cards': new_cards}
+        if new_manifest != manifest:
+            bytes_written += atomic_write(os.path.join(site_dir, MANIFEST_FILENAME),
+                                          json.dumps(new_manifest).encode('utf-8'))
+        return BuildResult(user_id, cards_rendered, cards_reused, page_written, bytes_written,
+                           time.perf_counter() - start)
+
+    def _render_card(self, card_template, movie):
+        if self._fragment_cache is not None:
+            return str(self._fragment_cache.render_cards(CARD_TEMPLATE, [movie])[0])
+        return card_template.render(movie=movie)
+
+    def _template_hash(self):
+        env = self._app.jinja_env
+        sources = [env.loader.get_source(env, name)[0] for name in (PAGE_TEMPLATE, CARD_TEMPLATE)]
+        return _sha256(''.join(sources))
+
+    @staticmethod
+    def _load_manifest(site_dir):
+        try:
+            with open(os.path.join(site_dir, MANIFEST_FILENAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _read_card(card_path):
+        try:
+            with open(card_path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+_worker_builder = None
+
+
+def _init_worker(builder):
+    global _worker_builder
+    # Pooled connections and sessions were inherited from the parent process and
+    # must not be shared with it, drop them without closing so the worker opens its own.
+    builder._data_manager.engine.dispose(close=False)
+    builder._data_manager.session.registry.clear()
+    _worker_builder = builder
+
+
+def _build_in_worker(user_id, batch_size):
+    return _worker_builder.build_user_site(user_id, batch_size=batch_size)
+
+
+def build_all_sites(builder, user_ids, workers=None, batch_size=MOVIE_BATCH_SIZE):
+    """Builds the sites of many users in parallel worker processes.
+
+    Yields (user_id, BuildResult, None) for every finished user, or
+    (user_id, None, error) when a build failed, in completion order. Workers
+    are forked so they inherit the Flask app and data manager, on platforms
+    without fork the users are built one after another in this process.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        for user_id in user_ids:
+            try:
+                yield user_id, builder.build_user_site(user_id, batch_size=batch_size), None
+            except Exception as e:
+                yield user_id, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                             initializer=_init_worker, initargs=(builder,)) as executor:
+        futures = {executor.submit(_build_in_worker, user_id, batch_size): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
@@ -5,26 +5,110 @@ class DataManagerInterface(ABC):
     def get_all_users(self):
         pass
 
+    @abstractmethod
+    def get_users_page(self, cursor=None, page_size=100, fields=None):
+        pass
+
     @abstractmethod
     def get_user_by_id(self, user_id):
         pass
 
+    @abstractmethod
+    def get_user_version(self, user_id):
+        pass
+
+    @abstractmethod
+    def get_users_version(self):
+        pass
+
     @abstractmethod
     def create_user(self, name):
         pass
 
     @abstractmethod
-    def get_movies_by_user(self, user_id):
+    def get_movies_by_user(self, user_id, order_by=None, limit=None):
+        pass
+
+    @abstractmethod
+    def iter_movies_by_user(self, user_id, order_by=None, batch_size=500):
+        pass
+
+    @abstractmethod
+    def stream_movie_batches(self, user_id=None, order_by=None, batch_size=1000):
+        pass
+
+    @abstractmethod
+    def get_movies_page(self, user_id, sort='title', cursor=None, page_size=50, fields=None):
+        pass
+
+    @abstractmethod
+    def get_user_movie_stats(self, user_id):
+        pass
+
+    @abstractmethod
+    def get_random_movie(self, user_id):
+        pass
+
+    @abstractmethod
+    def search_movies(self, user_id, query, limit=20):
         pass
 
     @abstractmethod
     def add_movie(self, user_id, name, director, year, rating):
         pass
 
+    @abstractmethod
+    def add_movies(self, user_id, movies):
+        pass
+
+    @abstractmethod
+    def load_movies(self, user_id, batches):
+        pass
+
     @abstractmethod
     def update_movie(self, movie_id, name, director, year, rating):
         pass
 
     @abstractmethod
     def delete_movie(self, movie_id):
+        pass
+
+    @abstractmethod
+    def delete_movies(self, user_id, movie_ids):
+        pass
+
+    @abstractmethod
+    def get_movie(self, movie_id, fields=None):
+        pass
+
+    @abstractmethod
+    def create_job(self, user_id, title):
+        pass
+
+    @abstractmethod
+    def create_jobs(self, user_id, titles):
+        pass
+
+    @abstractmethod
+    def get_jobs(self, user_id, first_id, last_id):
+        pass
+
+    @abstractmethod
+    def get_job(self, job_id):
+        pass
+
+    @abstractmethod
+    def get_unfinished_job_ids(self):
+        pass
+
+    @abstractmethod
+    def claim_job(self, job_id, stale_after_seconds):
+        pass
+
+    @abstractmethod
+    def requeue_running_jobs(self):
+        pass
+
+    @abstractmethod
+    def finish_job(self, job_id, movie=None, error=None):
         pass
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""Process-wide registry of database engines.
+
+Every data manager opened on the same database file in a process shares one
+engine, and so one connection pool and one set of pragmas, whether it was
+opened by the web app or the command-line interface. The schema is created
+and migrated once, when the engine is first created.
+
+In-memory databases are never shared: every one gets an engine (and a
+database) of its own, which makes them cheap, isolated instances for tests
+and benchmarks.
+"""
+import os
+import re
+import threading
+
+import sqlalchemy
+from sqlalchemy.pool import StaticPool
+
+from storage.migrations import run_migrations
+from storage.models import Base
+
+# Applied to every new SQLite connection as (pragma, app config key, default).
+# WAL lets the web server and the CLI read while the other one writes, and
+# busy_timeout makes a writer wait for the lock instead of failing with
+# "database is locked". Set a config key to None to keep SQLite's default.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'SQLITE_JOURNAL_MODE', 'WAL'),
+    # Safe with WAL: a power loss can lose the last commits but never corrupts the database.
+    ('synchronous', 'SQLITE_SYNCHRONOUS', 'NORMAL'),
+    ('busy_timeout', 'SQLITE_BUSY_TIMEOUT_MS', 5000),
+    ('mmap_size', 'SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+    # Negative values are KiB rather than pages.
+    ('cache_size', 'SQLITE_CACHE_SIZE', -64000),
+)
+
+_engines = {}  # database url -> [engine, number of holders]
+_lock = threading.Lock()
+
+
+def _sqlite_pragmas(config):
+    """Returns the PRAGMA statements configured for new connections."""
+    statements = []
+    for pragma, config_key, default in SQLITE_PRAGMAS:
+        value = config.get(config_key, default)
+        if value is None:
+            continue
+        # Pragma values can't be bound parameters, so only allow plain words and integers.
+        if not isinstance(value, int) and not re.fullmatch(r'\w+', str(value)):
+            raise ValueError(f"Invalid value for {config_key}: {value!r}")
+        statements.append(f"PRAGMA {pragma} = {value}")
+    return statements
+
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in pragmas:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def _is_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def _resolve_database_uri(database_uri, instance_path):
+    """Makes a relative SQLite database path relative to instance_path."""
+    url = sqlalchemy.engine.make_url(database_uri)
+    database = url.database
+    if (url.get_backend_name() != 'sqlite' or _is_memory(url) or database.startswith('file:')
+            or os.path.isabs(database) or instance_path is None):
+        return url
+    os.makedirs(instance_path, exist_ok=True)
+    return url.set(database=os.path.join(instance_path, database))
+
+
+def _create_engine(url, config):
+    if _is_memory(url):
+        # One connection for every thread, the database lives as long as it does.
+        engine = sqlalchemy.create_engine(url, poolclass=StaticPool, connect_args={'check_same_thread': False})
+    else:
+        engine = sqlalchemy.create_engine(url)
+    if engine.dialect.name == 'sqlite':
+        pragmas = _sqlite_pragmas(config)
+        sqlalchemy.event.listen(engine, 'connect',
+                                lambda dbapi_connection, _: _apply_pragmas(dbapi_connection, pragmas))
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    return engine
+
+
+def acquire_engine(database_uri, config=None, instance_path=None):
+    """Returns the engine of a database, creating and migrating it on first use.
+
+    A relative SQLite path is resolved against instance_path. config holds the
+    SQLITE_* pragma settings, they only take effect when the engine is
+    created. Hand the engine back with release_engine() when done.
+    """
+    url = _resolve_database_uri(database_uri, instance_path)
+    if _is_memory(url):
+        return _create_engine(url, config or {})
+    key = url.render_as_string(hide_password=False)
+    with _lock:
+        entry = _engines.get(key)
+        if entry is None:
+            entry = _engines[key] = [_create_engine(url, config or {}), 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release_engine(engine):
+    """Gives an engine back, disposing of it once nobody holds it anymore."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _lock:
+        entry = _engines.get(key)
+        if entry is not None and entry[0] is engine:
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del _engines[key]
+    engine.dispose()
@@ -0,0 +1,90 @@
+"""Versioned schema migrations for the SQLite movie database.
+
+``Base.metadata.create_all()`` only creates missing tables, it never touches
+tables that already exist. Every change to an existing table is therefore
+added here as a numbered migration. The version already applied is stored in SQLite's
+``PRAGMA user_version`` so each step runs exactly once per database file.
+"""
+
+
+def _migration_001_movie_indexes(connection):
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_user_id_rating ON movie (user_id, rating)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_user_id_title ON movie (user_id, title)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_imdb_id ON movie (imdb_id)")
+
+
+def _migration_002_movie_user_id_index(connection):
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_movie_user_id_id ON movie (user_id, id)")
+
+
+def _migration_003_movie_full_text_search(connection):
+    # External content table: the text lives in `movie`, FTS5 only keeps the
+    # index, and the triggers keep that index in step with every write.
+    connection.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS movie_fts "
+        "USING fts5(title, director, content='movie', content_rowid='id')")
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movie_fts_insert AFTER INSERT ON movie BEGIN "
+        "INSERT INTO movie_fts(rowid, title, director) VALUES (new.id, new.title, new.director); "
+        "END")
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movie_fts_delete AFTER DELETE ON movie BEGIN "
+        "INSERT INTO movie_fts(movie_fts, rowid, title, director) "
+        "VALUES ('delete', old.id, old.title, old.director); "
+        "END")
+    connection.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS movie_fts_update AFTER UPDATE OF title, director ON movie BEGIN "
+        "INSERT INTO movie_fts(movie_fts, rowid, title, director) "
+        "VALUES ('delete', old.id, old.title, old.director); "
+        "INSERT INTO movie_fts(rowid, title, director) VALUES (new.id, new.title, new.director); "
+        "END")
+    connection.exec_driver_sql("INSERT INTO movie_fts(movie_fts) VALUES ('rebuild')")
+
+
+def _add_column_if_missing(connection, table, column, definition):
+    # Fresh databases already got the column from create_all().
+    columns = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migration_004_user_version(connection):
+    _add_column_if_missing(connection, 'user', 'version', "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(connection, 'user', 'updated_at', "DATETIME")
+    connection.exec_driver_sql("UPDATE user SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+
+def _migration_005_movie_row_version(connection):
+    _add_column_if_missing(connection, 'movie', 'version', "INTEGER NOT NULL DEFAULT 0")
+
+
+# (version, migration) pairs, applied in order. Never edit or reorder a
+# migration that has been released, append a new one instead.
+MIGRATIONS = [
+    (1, _migration_001_movie_indexes),
+    (2, _migration_002_movie_user_id_index),
+    (3, _migration_003_movie_full_text_search),
+    (4, _migration_004_user_version),
+    (5, _migration_005_movie_row_version),
+]
+
+
+def get_schema_version(connection):
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def run_migrations(engine):
+    """Applies all pending migrations and returns the resulting schema version."""
+    with engine.begin() as connection:
+        current_version = get_schema_version(connection)
+        for version, migration in MIGRATIONS:
+            if version <= current_version:
+                continue
+            migration(connection)
+            connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+            current_version = version
+    return current_version
@@ -0,0 +1,74 @@
+"""Table definitions of the movie database.
+
+The models are defined once per process and shared by every data manager,
+whichever database it is connected to.
+"""
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import DeclarativeBase, relationship
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _new_row_version():
+    # A timestamp rather than a counter: SQLite can hand a deleted movie's id
+    # to a new movie, and the new row must not match the old row's version.
+    return time.time_ns()
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class User(Base):
+    __tablename__ = 'user'
+    id = Column(Integer, primary_key=True)
+    name = Column(String(80), unique=True, nullable=False)
+    # Bumped whenever one of the user's movies changes, for HTTP caching.
+    version = Column(Integer, nullable=False, default=0, server_default='0')
+    updated_at = Column(DateTime, default=_utcnow)
+    movies = relationship('Movie', backref='user', lazy=True)
+
+
+class Movie(Base):
+    __tablename__ = 'movie'
+    id = Column(Integer, primary_key=True)
+    title = Column(String(120), nullable=False)
+    director = Column(String(120))
+    year = Column(Integer)
+    rating = Column(Float)
+    poster_url = Column(String(255))
+    imdb_id = Column(String(20))
+    user_id = Column(Integer, ForeignKey('user.id'), nullable=False)
+    # Changes on every write, rendered fragments of the row are cached by it.
+    version = Column(Integer, nullable=False, default=_new_row_version, onupdate=_new_row_version,
+                     server_default='0')
+
+    # Keep in sync with storage/migrations.py so existing databases get the same indexes.
+    __table_args__ = (
+        Index('ix_movie_user_id_rating', 'user_id', 'rating'),
+        Index('ix_movie_user_id_title', 'user_id', 'title'),
+        Index('ix_movie_imdb_id', 'imdb_id'),
+        Index('ix_movie_user_id_id', 'user_id', 'id'),
+    )
+
+
+class Job(Base):
+    __tablename__ = 'job'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('user.id'), nullable=False)
+    title = Column(String(120), nullable=False)
+    status = Column(String(20), nullable=False, default=JOB_PENDING, index=True)
+    movie_id = Column(Integer)
+    error = Column(String(255))
+    created_at = Column(DateTime, nullable=False, default=_utcnow)
+    updated_at = Column(DateTime, nullable=False, default=_utcnow)
@@ -0,0 +1,68 @@
+"""Immutable row records returned by the data managers.
+
+Records use ``__slots__`` instead of a per-instance ``__dict__``, which keeps
+large result sets small. They support both attribute access (``movie.title``)
+and item access (``movie['title']``) so templates and the CLI can use either.
+A record built from a projected query only has the selected fields set.
+"""
+
+
+class _Record:
+    __slots__ = ()
+
+    @classmethod
+    def from_mapping(cls, mapping):
+        record = cls.__new__(cls)
+        set_field = object.__setattr__
+        for key, value in mapping.items():
+            set_field(record, key, value)
+        return record
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def keys(self):
+        """Names of the fields set on this record, in declaration order."""
+        return [field for field in self.__slots__ if hasattr(self, field)]
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.keys()}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self):
+        return hash(tuple(self.to_dict().items()))
+
+    def __repr__(self):
+        fields = ', '.join(f"{key}={value!r}" for key, value in self.to_dict().items())
+        return f"{type(self).__name__}({fields})"
+
+
+class UserRecord(_Record):
+    __slots__ = ('id', 'name', 'version', 'updated_at')
+
+
+class MovieRecord(_Record):
+    __slots__ = ('id', 'title', 'director', 'year', 'rating', 'poster_url', 'imdb_id', 'user_id', 'version')
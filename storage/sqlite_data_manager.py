@@ -1,84 +1,651 @@
+import base64
+import json
+import random
+import re
+import sys
+from datetime import timedelta
+
 import sqlalchemy
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import scoped_session, sessionmaker
 from storage.data_manager_interface import DataManagerInterface
+from storage.engines import acquire_engine, release_engine
+from storage.models import JOB_DONE, JOB_FAILED, JOB_PENDING, JOB_RUNNING, Job, Movie, User, _utcnow
+from storage.records import MovieRecord, UserRecord
+
+
+# Sort keys accepted by get_movies_by_user and get_movies_page, prefix with '-' for descending order.
+# Each one is backed by a (user_id, <column>) index so pages are read in index order.
+MOVIE_SORT_COLUMNS = ('title', 'rating')
+DELETE_CHUNK_SIZE = 500
+# Set for the duration of load_movies: a 256 MB page cache so the indexes being
+# written stay in memory, and no fsync per commit. In WAL mode NORMAL can lose
+# the last commits on power loss but never corrupts the database, OFF could.
+BULK_LOAD_PRAGMAS = {'synchronous': 'NORMAL', 'cache_size': -256000}
+
+
+def _parse_sort(sort):
+    """Splits a sort key like '-rating' into ('rating', True)."""
+    descending = sort.startswith('-')
+    sort_column = sort.lstrip('-')
+    if sort_column not in MOVIE_SORT_COLUMNS:
+        raise ValueError(f"Invalid sort key: {sort!r}")
+    return sort_column, descending
+
+
+def _order(column, id_column, descending):
+    """ORDER BY clauses for (column, id), the id breaks ties in the same direction."""
+    if descending:
+        return column.desc(), id_column.desc()
+    return column.asc(), id_column.asc()
+
+
+def _project(table, fields):
+    """Validates requested field names against a table, None means all columns."""
+    if not fields:
+        return [column.name for column in table.columns]
+    unknown = [field for field in fields if field not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def _encode_cursor(direction, value, movie_id):
+    payload = json.dumps([direction, value, movie_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, value, movie_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+    # bool is an int subclass but never a valid sort value or id.
+    valid_value = value is None or (isinstance(value, (str, int, float)) and not isinstance(value, bool))
+    valid_id = isinstance(movie_id, int) and not isinstance(movie_id, bool)
+    if direction not in ('after', 'before') or not valid_value or not valid_id:
+        raise ValueError(f"Invalid page cursor: {cursor!r}")
+    return direction, value, movie_id
+
+
+def _keyset_segments(column, id_column, value, movie_id, ascending):
+    """The (condition, order) queries that read the rows after (value, movie_id), in order.
+
+    Each segment is a row-value comparison or an equality, which SQLite runs
+    as a range seek on the (user_id, <column>) index, so a page deep into the
+    list costs the same as the first one. A row-value comparison never
+    matches NULL, and SQLite sorts NULL before any value, so rows without a
+    sort value are read as a segment of their own: first when ascending,
+    last when descending.
+    """
+    value_order = _order(column, id_column, not ascending)
+    if ascending:
+        if value is None:
+            return [(sqlalchemy.and_(column.is_(None), id_column > movie_id), (id_column.asc(),)),
+                    (column.isnot(None), value_order)]
+        return [(sqlalchemy.tuple_(column, id_column) > (value, movie_id), value_order)]
+    if value is None:
+        return [(sqlalchemy.and_(column.is_(None), id_column < movie_id), (id_column.desc(),))]
+    segments = [(sqlalchemy.tuple_(column, id_column) < (value, movie_id), value_order)]
+    if column.nullable:
+        segments.append((column.is_(None), (id_column.desc(),)))
+    return segments
+
+
+# One round trip: window functions number the rated movies both ways so the
+# best, worst and middle rows can be picked out next to the overall aggregates.
+MOVIE_STATS_SQL = sqlalchemy.text("""
+    WITH ranked AS (
+        SELECT title, rating,
+               COUNT(*) OVER () AS total,
+               COUNT(rating) OVER () AS rated,
+               AVG(rating) OVER () AS average,
+               ROW_NUMBER() OVER (ORDER BY rating IS NULL, rating, id) AS rank_asc,
+               ROW_NUMBER() OVER (ORDER BY rating IS NULL, rating DESC, id) AS rank_desc
+        FROM movie
+        WHERE user_id = :user_id
+    )
+    SELECT title, rating, total, rated, average, rank_asc, rank_desc
+    FROM ranked
+    WHERE rank_asc = 1
+       OR rank_desc = 1
+       OR rank_asc IN ((rated + 1) / 2, (rated + 2) / 2)
+""")
+
+
+# Title matches weigh ten times as much as director matches in the bm25 ranking.
+SEARCH_MOVIES_SQL = sqlalchemy.text("""
+    SELECT movie.*
+    FROM movie_fts
+    JOIN movie ON movie.id = movie_fts.rowid
+    WHERE movie_fts MATCH :match AND movie.user_id = :user_id
+    ORDER BY bm25(movie_fts, 10.0, 1.0)
+    LIMIT :limit
+""")
+
+
+def _fts_prefix_query(search_term):
+    """Turns free text into an FTS5 query matching every word as a prefix."""
+    words = re.findall(r'\w+', search_term)
+    return ' '.join(f'"{word}"*' for word in words)
 
 
 class SQLiteDataManager(DataManagerInterface):
-    def __init__(self, app):
-        self.db = SQLAlchemy(app)
-
-        class User(self.db.Model):
-            id = self.db.Column(self.db.Integer, primary_key=True)
-            name = self.db.Column(self.db.String(80), unique=True, nullable=False)
-            movies = self.db.relationship('Movie', backref='user', lazy=True)
-
-        class Movie(self.db.Model):
-            id = self.db.Column(self.db.Integer, primary_key=True)
-            title = self.db.Column(self.db.String(120), nullable=False)
-            director = self.db.Column(self.db.String(120))
-            year = self.db.Column(self.db.Integer)
-            rating = self.db.Column(self.db.Float)
-            poster_url = self.db.Column(self.db.String(255))
-            imdb_id = self.db.Column(self.db.String(20))
-            user_id = self.db.Column(self.db.Integer, self.db.ForeignKey('user.id'), nullable=False)
-
-        self.User = User
-        self.Movie = Movie
-        with app.app_context():
-            self.db.create_all()
-
-    def _convert_to_dict(self, db_object):
-        return {col.name: getattr(db_object, col.name) for col in db_object.__table__.columns}
+    User = User
+    Movie = Movie
+    Job = Job
+
+    def __init__(self, database_uri, config=None, instance_path=None):
+        """Opens a database, see storage.engines.acquire_engine.
+
+        Data managers on the same database file share one engine. An
+        in-memory database ('sqlite://') is private to its data manager.
+        """
+        self.engine = acquire_engine(database_uri, config, instance_path)
+        # One session per thread. The web app removes it when the app context ends,
+        # other long-running callers should call close_session() when done.
+        self.session = scoped_session(sessionmaker(bind=self.engine))
+
+    def close_session(self):
+        """Releases the current thread's session and its connection."""
+        self.session.remove()
+
+    def close(self):
+        """Closes the data manager's sessions and releases its engine."""
+        self.session.remove()
+        release_engine(self.engine)
+
+    # Reads go through Core select() and come back as compact immutable
+    # records: no ORM instances, identity map bookkeeping or per-row __dict__.
+    def _fetch_all(self, statement, record_type=MovieRecord):
+        to_record = record_type.from_mapping
+        return [to_record(row) for row in self.session.execute(statement).mappings()]
+
+    def _fetch_one(self, statement, record_type=MovieRecord):
+        row = self.session.execute(statement).mappings().first()
+        return record_type.from_mapping(row) if row else None
+
+    def _bump_user_version(self, user_id, connection=None):
+        """Marks a user's movies as changed, as part of the current transaction."""
+        (connection or self.session).execute(
+            sqlalchemy.update(self.User)
+            .where(self.User.id == user_id)
+            .values(version=self.User.version + 1, updated_at=_utcnow())
+        )
+
+    def get_user_version(self, user_id):
+        """Returns (version, updated_at) of a user's movie collection, or None for an unknown user."""
+        row = self.session.execute(
+            sqlalchemy.select(self.User.version, self.User.updated_at).where(self.User.id == user_id)
+        ).first()
+        return tuple(row) if row else None
+
+    def get_users_version(self):
+        """Returns (user count, highest user id, latest updated_at) of the user list."""
+        row = self.session.execute(
+            sqlalchemy.select(sqlalchemy.func.count(self.User.id),
+                              sqlalchemy.func.max(self.User.id),
+                              sqlalchemy.func.max(self.User.updated_at))
+        ).one()
+        return tuple(row)
 
     def get_all_users(self):
-        users = self.User.query.all()
-        return [self._convert_to_dict(user) for user in users]
+        return self._fetch_all(sqlalchemy.select(self.User.__table__), UserRecord)
+
+    def get_users_page(self, cursor=None, page_size=100, fields=None):
+        """Returns one page of users in id order, see get_movies_page.
+
+        Only forward paging is supported, the result has 'users' and
+        'next_cursor'.
+        """
+        user_table = self.User.__table__
+        field_names = _project(user_table, fields)
+        _, _, last_id = _decode_cursor(cursor) if cursor else (None, None, 0)
+        selected = list(dict.fromkeys(field_names + ['id']))
+        rows = self.session.execute(
+            sqlalchemy.select(*(user_table.c[name] for name in selected))
+            .where(user_table.c.id > last_id)
+            .order_by(user_table.c.id)
+            .limit(page_size + 1)
+        ).mappings().all()
+
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = _encode_cursor('after', None, rows[-1]['id'])
+        return {
+            'users': [UserRecord(**{name: row[name] for name in field_names}) for row in rows],
+            'next_cursor': next_cursor,
+        }
 
     def get_user_by_id(self, user_id):
-        user = self.User.query.get(user_id)
-        if user:
-            return self._convert_to_dict(user)
-        return None
+        user_table = self.User.__table__
+        return self._fetch_one(sqlalchemy.select(user_table).where(user_table.c.id == user_id), UserRecord)
 
     def create_user(self, name):
         try:
             new_user = self.User(name=name)
-            self.db.session.add(new_user)
-            self.db.session.commit()
+            self.session.add(new_user)
+            self.session.commit()
             return True
         except sqlalchemy.exc.IntegrityError:  # Catch IntegrityError for duplicate user names
-            self.db.session.rollback()
+            self.session.rollback()
             return False
 
     def add_movie(self, user_id, title, director, year, rating, poster_url, imdb_id):
         try:
             new_movie = self.Movie(user_id=user_id, title=title, director=director, year=year, rating=rating,
                                    poster_url=poster_url, imdb_id=imdb_id)
-            self.db.session.add(new_movie)
-            self.db.session.commit()
+            self.session.add(new_movie)
+            self._bump_user_version(user_id)
+            self.session.commit()
         except Exception as e:  # Catch any database error
-            self.db.session.rollback()
-            print(f"Database error: {e}")
+            self.session.rollback()
+            print(f"Database error: {e}", file=sys.stderr)
+
+    def add_movies(self, user_id, movies):
+        """Inserts many movies for a user in one transaction.
+
+        movies is an iterable of dicts with the add_movie columns. Returns the
+        number of movies inserted, 0 if the transaction failed.
+        """
+        rows = [{**movie, 'user_id': user_id} for movie in movies]
+        if not rows:
+            return 0
+        try:
+            self.session.execute(sqlalchemy.insert(self.Movie), rows)
+            self._bump_user_version(user_id)
+            self.session.commit()
+            return len(rows)
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            self.session.rollback()
+            print(f"Database error: {e}", file=sys.stderr)
+            return 0
+
+    def load_movies(self, user_id, batches):
+        """Bulk-inserts batches of movies for a user, one transaction per batch.
+
+        batches is an iterable of lists of dicts with the add_movie columns, it
+        is consumed between transactions, so it can stream from a file. The
+        load runs on a connection of its own with BULK_LOAD_PRAGMAS, which are
+        set back afterwards. Returns the number of movies inserted. A database
+        error stops the load and is raised, the batches committed before it
+        stay: a batch is committed before the next one is taken from batches.
+        """
+        movie_table = self.Movie.__table__
+        inserted = 0
+        with self.engine.connect() as connection:
+            saved = {pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar() for pragma in BULK_LOAD_PRAGMAS}
+            try:
+                for pragma, value in BULK_LOAD_PRAGMAS.items():
+                    connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+                connection.commit()
+                for batch in batches:
+                    if not batch:
+                        continue
+                    with connection.begin():
+                        connection.execute(sqlalchemy.insert(movie_table),
+                                           [{**movie, 'user_id': user_id} for movie in batch])
+                        self._bump_user_version(user_id, connection)
+                    inserted += len(batch)
+            finally:
+                # The connection goes back to the pool, later users must get the normal settings.
+                connection.rollback()
+                for pragma, value in saved.items():
+                    connection.exec_driver_sql(f"PRAGMA {pragma} = {value}")
+                connection.commit()
+        return inserted
+
+    def _movies_statement(self, user_id=None, order_by=None):
+        """Selects the movies of a user (or every user's) in id order, or ordered by a sort key."""
+        movie_table = self.Movie.__table__
+        statement = sqlalchemy.select(movie_table)
+        if user_id is not None:
+            statement = statement.where(movie_table.c.user_id == user_id)
+        if not order_by:
+            return statement.order_by(movie_table.c.id)
+        sort_column, descending = _parse_sort(order_by)
+        return statement.order_by(*_order(movie_table.c[sort_column], movie_table.c.id, descending))
+
+    def get_movies_by_user(self, user_id, order_by=None, limit=None):
+        """Returns a user's movies, optionally ordered by a sort key and limited.
 
-    def get_movies_by_user(self, user_id):
-        movies = self.Movie.query.filter_by(user_id=user_id).all()
-        return [self._convert_to_dict(movie) for movie in movies]
+        Ordering and limiting happen in SQL along the (user_id, <column>) index,
+        so a top-N query reads N index entries instead of sorting everything.
+        """
+        statement = self._movies_statement(user_id, order_by)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return self._fetch_all(statement)
+
+    def iter_movies_by_user(self, user_id, order_by=None, batch_size=500):
+        """Returns an iterator over a user's movies, in id order or ordered by a sort key.
+
+        The movies come off one open cursor like stream_movie_batches(), one
+        at a time.
+        """
+        return self._stream_rows(self._movies_statement(user_id, order_by), batch_size)
+
+    def stream_movie_batches(self, user_id=None, order_by=None, batch_size=1000):
+        """Returns an iterator over lists of at most batch_size movies, read from one open cursor.
+
+        Rows are fetched a batch at a time while the caller consumes them, so
+        memory is bounded by the batch size however many movies there are.
+        The read stays open until the iterator is exhausted or closed, so
+        consume it promptly. user_id None streams every user's movies. An
+        invalid order_by raises ValueError right away, not on first iteration.
+        """
+        return self._stream_batches(self._movies_statement(user_id, order_by), batch_size)
+
+    def _stream_batches(self, statement, batch_size):
+        result = self.session.execute(statement, execution_options={'yield_per': batch_size})
+        try:
+            to_record = MovieRecord.from_mapping
+            for rows in result.mappings().partitions():
+                yield [to_record(row) for row in rows]
+        finally:
+            result.close()
+
+    def _stream_rows(self, statement, batch_size):
+        batches = self._stream_batches(statement, batch_size)
+        try:
+            for batch in batches:
+                yield from batch
+        finally:
+            batches.close()
+
+    def get_movies_page(self, user_id, sort='title', cursor=None, page_size=50, fields=None):
+        """Returns one page of a user's movies using keyset pagination.
+
+        The result is a dict with the page's 'movies' and opaque 'next_cursor' /
+        'prev_cursor' strings (None when there is no such page). fields limits
+        the selected columns to the given names. Raises ValueError for an
+        unknown sort key or field, or a malformed cursor.
+        """
+        movie_table = self.Movie.__table__
+        field_names = _project(movie_table, fields)
+        sort_column, descending = _parse_sort(sort)
+        column = movie_table.c[sort_column]
+        id_column = movie_table.c.id
+        direction, value, last_id = _decode_cursor(cursor) if cursor else ('after', None, None)
+        backward = direction == 'before'
+        # Walking backwards is walking forwards in the reversed order.
+        ascending = descending == backward
+
+        # The cursor needs the sort column and id even if they weren't asked for.
+        selected = list(dict.fromkeys(field_names + ['id', sort_column]))
+        statement = (sqlalchemy.select(*(movie_table.c[name] for name in selected))
+                     .where(movie_table.c.user_id == user_id))
+        if cursor:
+            segments = _keyset_segments(column, id_column, value, last_id, ascending)
+        else:
+            segments = [(sqlalchemy.true(), _order(column, id_column, not ascending))]
+        rows = []
+        for condition, order in segments:
+            # The next segment is only read when this one can't fill the page.
+            rows += self.session.execute(
+                statement.where(condition).order_by(*order).limit(page_size + 1 - len(rows))
+            ).mappings().all()
+            if len(rows) > page_size:
+                break
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backward:
+            rows.reverse()
+
+        next_cursor = prev_cursor = None
+        if rows:
+            first, last = rows[0], rows[-1]
+            if has_more or backward:
+                next_cursor = _encode_cursor('after', last[sort_column], last['id'])
+            if (has_more and backward) or (cursor and not backward):
+                prev_cursor = _encode_cursor('before', first[sort_column], first['id'])
+
+        return {
+            'movies': [MovieRecord(**{name: row[name] for name in field_names}) for row in rows],
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+        }
+
+    def get_user_movie_stats(self, user_id):
+        """Returns rating statistics for a user's movies computed in SQL.
+
+        The dict holds the number of movies, the number of rated movies, the
+        average and median rating and the best and worst movie, or None if the
+        user has no movies. Movies without a rating are left out of the rating
+        statistics, which are None when no movie is rated.
+        """
+        rows = self.session.execute(MOVIE_STATS_SQL, {'user_id': user_id}).mappings().all()
+        if not rows:
+            return None
+
+        rated = rows[0]['rated']
+        stats = {
+            'count': rows[0]['total'],
+            'rated_count': rated,
+            'average': rows[0]['average'],
+            'median': None,
+            'best': None,
+            'worst': None,
+        }
+        if not rated:
+            return stats
+
+        middle = [row['rating'] for row in rows if row['rank_asc'] in ((rated + 1) // 2, (rated + 2) // 2)]
+        stats['median'] = sum(middle) / len(middle)
+        for row in rows:
+            if row['rank_desc'] == 1:
+                stats['best'] = {'title': row['title'], 'rating': row['rating']}
+            if row['rank_asc'] == 1:
+                stats['worst'] = {'title': row['title'], 'rating': row['rating']}
+        return stats
+
+    def get_random_movie(self, user_id, attempts=5):
+        """Returns a random movie of the user, or None if the user has no movies.
+
+        Draws random ids between the user's lowest and highest movie id and
+        returns the first draw that hits one of the user's movies, so far every
+        movie is equally likely. Ids can have gaps (deleted movies, other users'
+        movies), so after `attempts` misses it makes one more draw and seeks the
+        nearest movie, after or before it at random. That pick is biased: a
+        movie's chance grows with the gaps next to it, so a movie that follows or
+        precedes a long run of other users' ids comes up more often. Every query
+        is an index probe or seek on (user_id, id), the collection is never
+        loaded.
+        """
+        movie_table = self.Movie.__table__
+        user_ids = sqlalchemy.select(movie_table.c.id).where(movie_table.c.user_id == user_id)
+        # Two scalar subqueries, SQLite answers a lone min() or max() with one probe of the index.
+        lowest_id, highest_id = self.session.execute(sqlalchemy.select(
+            user_ids.with_only_columns(sqlalchemy.func.min(movie_table.c.id)).scalar_subquery(),
+            user_ids.with_only_columns(sqlalchemy.func.max(movie_table.c.id)).scalar_subquery(),
+        )).one()
+        if lowest_id is None:
+            return None
+
+        user_movies = sqlalchemy.select(movie_table).where(movie_table.c.user_id == user_id)
+        for _ in range(attempts):
+            movie = self._fetch_one(user_movies.where(movie_table.c.id == random.randint(lowest_id, highest_id)))
+            if movie:
+                return movie
+
+        # Seeking both ways evens out the bias towards movies that follow a gap.
+        drawn_id = random.randint(lowest_id, highest_id)
+        if random.random() < 0.5:
+            nearest = user_movies.where(movie_table.c.id >= drawn_id).order_by(movie_table.c.id)
+        else:
+            nearest = user_movies.where(movie_table.c.id <= drawn_id).order_by(movie_table.c.id.desc())
+        return self._fetch_one(nearest.limit(1))
+
+    def search_movies(self, user_id, query, limit=20):
+        """Full-text searches a user's movies by title and director.
+
+        Every word of the query is matched as a prefix ("godf" finds "The
+        Godfather") and results are ordered by bm25 relevance.
+        """
+        match = _fts_prefix_query(query)
+        if not match:
+            return []
+        rows = self.session.execute(SEARCH_MOVIES_SQL, {'match': match, 'user_id': user_id, 'limit': limit})
+        return [MovieRecord.from_mapping(row) for row in rows.mappings()]
 
     def update_movie(self, movie_id, name, director, year, rating):
-        movie = self.Movie.query.get(movie_id)
+        movie = self.session.get(self.Movie, movie_id)
         if movie:
-            movie.name = name
+            movie.title = name
             movie.director = director
             movie.year = year
             movie.rating = rating
-            self.db.session.commit()
+            self._bump_user_version(movie.user_id)
+            self.session.commit()
 
     def delete_movie(self, movie_id):
-        movie = self.Movie.query.get(movie_id)
+        movie = self.session.get(self.Movie, movie_id)
         if movie:
-            self.db.session.delete(movie)
-            self.db.session.commit()
+            self.session.delete(movie)
+            self._bump_user_version(movie.user_id)
+            self.session.commit()
+
+    def delete_movies(self, user_id, movie_ids):
+        """Deletes many of a user's movies in one transaction.
+
+        Ids of other users' movies or of missing movies are skipped. Returns
+        the ids that were deleted, an empty list if the transaction failed.
+        """
+        movie_table = self.Movie.__table__
+        movie_ids = list(dict.fromkeys(movie_ids))
+        deleted = []
+        try:
+            # Chunked to stay below SQLite's limit on bound parameters per statement.
+            for start in range(0, len(movie_ids), DELETE_CHUNK_SIZE):
+                result = self.session.execute(
+                    sqlalchemy.delete(movie_table)
+                    .where(movie_table.c.user_id == user_id,
+                           movie_table.c.id.in_(movie_ids[start:start + DELETE_CHUNK_SIZE]))
+                    .returning(movie_table.c.id)
+                )
+                deleted.extend(result.scalars())
+            if deleted:
+                self._bump_user_version(user_id)
+            self.session.commit()
+            return deleted
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            self.session.rollback()
+            print(f"Database error: {e}", file=sys.stderr)
+            return []
+
+    def create_job(self, user_id, title):
+        """Stores a pending add-movie job and returns its id."""
+        job = self.Job(user_id=user_id, title=title)
+        self.session.add(job)
+        self.session.commit()
+        return job.id
+
+    def create_jobs(self, user_id, titles):
+        """Stores a pending add-movie job per title in one transaction, returns the job ids.
+
+        The ids are consecutive: SQLite has one writer at a time, so no other
+        job can be inserted in between.
+        """
+        jobs = [self.Job(user_id=user_id, title=title) for title in titles]
+        self.session.add_all(jobs)
+        self.session.commit()
+        return [job.id for job in jobs]
+
+    def get_jobs(self, user_id, first_id, last_id):
+        """Returns a user's jobs with ids from first_id to last_id, in id order."""
+        job_table = self.Job.__table__
+        rows = self.session.execute(
+            sqlalchemy.select(job_table)
+            .where(job_table.c.user_id == user_id, job_table.c.id.between(first_id, last_id))
+            .order_by(job_table.c.id)
+        ).mappings()
+        return [dict(row) for row in rows]
+
+    def get_job(self, job_id):
+        job_table = self.Job.__table__
+        row = self.session.execute(sqlalchemy.select(job_table).where(job_table.c.id == job_id)).mappings().first()
+        return dict(row) if row else None
+
+    def get_unfinished_job_ids(self):
+        rows = (self.session.query(self.Job.id)
+                .filter(self.Job.status.in_((JOB_PENDING, JOB_RUNNING)))
+                .order_by(self.Job.id))
+        return [job_id for (job_id,) in rows]
+
+    def claim_job(self, job_id, stale_after_seconds):
+        """Marks a job as running, returns False if someone else already has it.
+
+        A job that has been running for longer than stale_after_seconds is
+        assumed to belong to a worker that died, and can be claimed again.
+        """
+        now = _utcnow()
+        stale_before = now - timedelta(seconds=stale_after_seconds)
+        result = self.session.execute(
+            sqlalchemy.update(self.Job)
+            .where(self.Job.id == job_id)
+            .where(sqlalchemy.or_(self.Job.status == JOB_PENDING,
+                                  sqlalchemy.and_(self.Job.status == JOB_RUNNING,
+                                                  self.Job.updated_at < stale_before)))
+            .values(status=JOB_RUNNING, updated_at=now)
+        )
+        self.session.commit()
+        return result.rowcount == 1
+
+    def requeue_running_jobs(self):
+        """Puts every running job back to pending, returns how many there were."""
+        result = self.session.execute(
+            sqlalchemy.update(self.Job)
+            .where(self.Job.status == JOB_RUNNING)
+            .values(status=JOB_PENDING, updated_at=_utcnow())
+        )
+        self.session.commit()
+        return result.rowcount
+
+    def finish_job(self, job_id, movie=None, error=None):
+        """Completes a running job, inserting its movie in the same transaction.
+
+        Pass the movie's columns as a dict on success, or an error message on
+        failure. A job that isn't running any more is left alone: it was
+        requeued and claimed again, and the other run finishes it.
+        """
+        job_table = self.Job.__table__
+        movie_table = self.Movie.__table__
+        try:
+            # Checking and changing the status in one statement keeps two runs from both finishing the job.
+            user_id = self.session.execute(
+                sqlalchemy.update(job_table)
+                .where(job_table.c.id == job_id, job_table.c.status == JOB_RUNNING)
+                .values(status=JOB_FAILED if movie is None else JOB_DONE,
+                        error=(error or "Unknown error")[:255] if movie is None else None,
+                        updated_at=_utcnow())
+                .returning(job_table.c.user_id)
+            ).scalar()
+            if user_id is None:
+                self.session.rollback()
+                return
+            if movie is not None:
+                movie_id = self.session.execute(
+                    sqlalchemy.insert(movie_table).values(user_id=user_id, **movie).returning(movie_table.c.id)
+                ).scalar_one()
+                self.session.execute(
+                    sqlalchemy.update(job_table).where(job_table.c.id == job_id).values(movie_id=movie_id)
+                )
+                self._bump_user_version(user_id)
+            self.session.commit()
+        except sqlalchemy.exc.SQLAlchemyError as e:
+            self.session.rollback()
+            print(f"Database error: {e}", file=sys.stderr)
+
+    def get_movie(self, movie_id, fields=None):
+        """Returns a movie with the given columns set, or None if it doesn't exist."""
+        movie_table = self.Movie.__table__
+        field_names = _project(movie_table, fields)
+        row = self.session.execute(
+            sqlalchemy.select(*(movie_table.c[name] for name in field_names)).where(movie_table.c.id == movie_id)
+        ).mappings().first()
+        return MovieRecord.from_mapping(row) if row else None
 
     def get_movie_by_id(self, movie_id):
-        movie = self.Movie.query.get(movie_id)
-        return movie
\ No newline at end of file
+        return self.get_movie(movie_id)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import pytest
+from flask import Flask
+
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.fixture
+def data_manager():
+    """A data manager on a fresh in-memory database."""
+    data_manager = SQLiteDataManager('sqlite://')
+    yield data_manager
+    data_manager.close()
@@ -0,0 +1,82 @@
+import gzip
+import json
+
+import pytest
+
+from api import MAX_PAGE_SIZE, PUBLIC_MOVIE_FIELDS, PUBLIC_USER_FIELDS, create_api_blueprint
+
+
+@pytest.fixture
+def client(app, data_manager):
+    app.register_blueprint(create_api_blueprint(data_manager))
+    data_manager.create_user("alice")
+    for i in range(30):
+        data_manager.add_movie(1, f"Movie {i:02d}", "Director", 2000 + i, 7.0, None, f"tt{i:07d}")
+    return app.test_client()
+
+
+def test_movies_are_paginated(client):
+    titles = []
+    url = '/api/v1/users/1/movies?limit=7&fields=title'
+    while url:
+        body = client.get(url).get_json()
+        titles += [movie['title'] for movie in body['data']]
+        url = body['next_cursor'] and f"/api/v1/users/1/movies?limit=7&fields=title&cursor={body['next_cursor']}"
+    assert titles == [f"Movie {i:02d}" for i in range(30)]
+
+
+def test_fields_select_columns(client):
+    body = client.get('/api/v1/movies/3?fields=title, year').get_json()
+    assert body == {'data': {'title': "Movie 02", 'year': 2002}}
+    users = client.get('/api/v1/users?fields=name').get_json()
+    assert users == {'data': [{'name': "alice"}], 'next_cursor': None}
+
+
+def test_only_public_columns_are_served(client):
+    assert set(client.get('/api/v1/movies/3').get_json()['data']) == set(PUBLIC_MOVIE_FIELDS)
+    assert set(client.get('/api/v1/movies/3?fields=,').get_json()['data']) == set(PUBLIC_MOVIE_FIELDS)
+    movies = client.get('/api/v1/users/1/movies?limit=2').get_json()['data']
+    assert [set(movie) for movie in movies] == [set(PUBLIC_MOVIE_FIELDS)] * 2
+    (user,) = client.get('/api/v1/users').get_json()['data']
+    assert set(user) == set(PUBLIC_USER_FIELDS)
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/movies/1?fields=budget',
+    '/api/v1/movies/1?fields=title,version',
+    '/api/v1/users/1/movies?fields=version',
+    '/api/v1/users?fields=updated_at',
+    '/api/v1/users?fields=version',
+    '/api/v1/users/1/movies?sort=budget',
+    '/api/v1/users/1/movies?cursor=nonsense',
+    '/api/v1/users/1/movies?cursor=WyJhZnRlciIsIHsiYSI6IDF9LCAzXQ',
+    '/api/v1/users?limit=ten',
+])
+def test_bad_requests(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('url', ['/api/v1/movies/999', '/api/v1/users/9/movies'])
+def test_not_found(client, url):
+    assert client.get(url).status_code == 404
+
+
+def test_limit_is_capped(client, data_manager):
+    for i in range(MAX_PAGE_SIZE):
+        data_manager.add_movie(1, f"More {i}", None, None, None, None, None)
+    body = client.get('/api/v1/users/1/movies?limit=100000&fields=id').get_json()
+    assert len(body['data']) == MAX_PAGE_SIZE
+
+
+def test_large_responses_are_gzipped(client):
+    response = client.get('/api/v1/users/1/movies', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert len(json.loads(gzip.decompress(response.data))['data']) == 30
+
+    small = client.get('/api/v1/movies/1?fields=id', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    plain = client.get('/api/v1/users/1/movies')
+    assert 'Content-Encoding' not in plain.headers
@@ -0,0 +1,156 @@
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import movie_jobs
+from app import create_app
+from storage.sqlite_data_manager import SQLiteDataManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    # The job queue's workers run in threads of their own, each needs a connection of its own.
+    data_manager = SQLiteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    yield data_manager
+    data_manager.close()
+
+
+@pytest.fixture
+def client(data_manager):
+    app = create_app({'TESTING': True, 'RESUME_MOVIE_JOBS': False}, data_manager=data_manager)
+    data_manager.create_user("alice")
+    for title, rating in [("Heat", 8.3), ("Alien", 8.5), ("Brazil", 7.9)]:
+        data_manager.add_movie(1, title, None, 1995, rating, None, None)
+    yield app.test_client()
+    app.extensions['job_queue'].shutdown()
+
+
+def test_user_page_revalidates_with_etag(client, data_manager):
+    response = client.get('/users/1')
+    assert response.status_code == 200
+    assert b"Brazil" in response.data
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    etag = response.headers['ETag']
+    cached = client.get('/users/1', headers={'If-None-Match': etag})
+    assert (cached.status_code, cached.data) == (304, b'')
+    assert client.get('/users/1?sort=-rating', headers={'If-None-Match': etag}).status_code == 200
+
+    data_manager.add_movie(1, "Zodiac", None, 2007, 7.7, None, None)
+    assert client.get('/users/1', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_every_process_issues_the_same_etags(client, data_manager):
+    # Each worker of a deployment is a process of its own, with an app of its own.
+    script = ("from app import create_app; "
+              f"app = create_app({{'RESUME_MOVIE_JOBS': False, 'SQLALCHEMY_DATABASE_URI': {str(data_manager.engine.url)!r}}}); "
+              "print(app.test_client().get('/users/1').headers['ETag']); "
+              "app.extensions['job_queue'].shutdown()")
+    etags = {subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=ROOT).stdout.strip() for _ in range(2)}
+    assert etags == {client.get('/users/1').headers['ETag']}
+
+
+def test_user_page_revalidates_with_last_modified(client):
+    last_modified = client.get('/users/1').headers['Last-Modified']
+    assert client.get('/users/1', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+
+def test_users_list_revalidates(client, data_manager):
+    etag = client.get('/users').headers['ETag']
+    assert client.get('/users', headers={'If-None-Match': etag}).status_code == 304
+    data_manager.create_user("bob")
+    assert client.get('/users', headers={'If-None-Match': etag}).status_code == 200
+
+
+@pytest.mark.parametrize('url, status', [
+    ('/users/9', 404),
+    ('/users/1?sort=budget', 400),
+    ('/users/1?view=all&sort=budget', 400),
+    ('/users/1?cursor=nonsense', 400),
+])
+def test_user_page_errors(client, url, status):
+    assert client.get(url).status_code == status
+
+
+def test_streamed_collection(client):
+    response = client.get('/users/1?view=all&sort=-rating')
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert html.index("Alien") < html.index("Heat") < html.index("Brazil")
+    assert 'ETag' in response.headers
+
+
+def test_static_files_are_sent_precompressed(client):
+    response = client.get('/static/style.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    plain = client.get('/static/style.css')
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_app_starts_when_static_files_cannot_be_compressed(data_manager, monkeypatch):
+    def read_only(directory):
+        raise PermissionError(13, "Read-only file system", directory)
+
+    monkeypatch.setattr('app.compress_directory', read_only)
+    app = create_app({'TESTING': True, 'RESUME_MOVIE_JOBS': False}, data_manager=data_manager)
+    try:
+        response = app.test_client().get('/static/style.css', headers={'Accept-Encoding': 'identity'})
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        response.close()
+    finally:
+        app.extensions['job_queue'].shutdown()
+
+
+def test_job_status(client, data_manager):
+    job_id = data_manager.create_job(1, "Heat")
+    response = client.get(f'/jobs/{job_id}', headers={'Accept': 'application/json'})
+    assert response.get_json()['status'] == 'pending'
+    assert b"Heat" in client.get(f'/jobs/{job_id}').data
+    assert client.get('/jobs/999').status_code == 404
+
+
+def test_export_route_streams_the_collection(client):
+    response = client.get('/users/1/export?format=jsonl')
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename="movies-1.jsonl"'
+    assert [json.loads(line)['title'] for line in response.get_data().splitlines()] == ["Heat", "Alien", "Brazil"]
+    assert client.get('/users/1/export?format=xml').status_code == 400
+    assert client.get('/users/9/export').status_code == 404
+
+
+class StubClient:
+    def fetch_by_title(self, title):
+        if title == 'Haet':
+            return {'Response': 'False', 'Error': 'Movie not found!'}
+        return {'Response': 'True', 'Title': title, 'Year': '1995', 'Director': 'N/A', 'imdbRating': '7.5',
+                'Poster': 'N/A', 'imdbID': 'tt0113277'}
+
+
+def test_import_runs_in_background_jobs(client, monkeypatch):
+    monkeypatch.setattr(movie_jobs, 'get_client', StubClient)
+    upload = (io.BytesIO(b"title\nMemento\nHaet\n"), 'titles.csv')
+    response = client.post('/users/1/import', data={'titles': upload}, content_type='multipart/form-data')
+    assert response.status_code == 302
+    status_url = response.headers['Location']
+    client.application.extensions['job_queue'].shutdown()
+
+    jobs = client.get(status_url, headers={'Accept': 'application/json'}).get_json()
+    assert [(job['title'], job['status']) for job in jobs] == [("Memento", 'done'), ("Haet", 'failed')]
+    assert b"Haet" in client.get(status_url).data
+
+
+def test_import_without_titles(client):
+    upload = (io.BytesIO(b"title\n"), 'titles.csv')
+    response = client.post('/users/1/import', data={'titles': upload}, content_type='multipart/form-data')
+    assert response.status_code == 400
+    assert client.get('/users/1/import/5-4').status_code == 404
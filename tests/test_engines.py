@@ -0,0 +1,81 @@
+import pytest
+
+from storage import engines
+from storage.engines import _sqlite_pragmas, acquire_engine, release_engine
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+@pytest.fixture
+def database_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'movies.db'}"
+
+
+def connection_pragmas(database_uri, **config):
+    engine = acquire_engine(database_uri, config)
+    try:
+        with engine.connect() as connection:
+            return {pragma: connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size')}
+    finally:
+        release_engine(engine)
+
+
+def test_connections_use_wal_and_busy_timeout(database_uri):
+    assert connection_pragmas(database_uri) == {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000,
+                                                'cache_size': -64000}
+
+
+def test_pragmas_follow_the_config(database_uri):
+    pragmas = connection_pragmas(database_uri, SQLITE_JOURNAL_MODE=None, SQLITE_SYNCHRONOUS='FULL',
+                                 SQLITE_BUSY_TIMEOUT_MS=250)
+    assert pragmas['journal_mode'] == 'delete'
+    assert (pragmas['synchronous'], pragmas['busy_timeout']) == (2, 250)
+
+
+def test_pragma_values_are_validated():
+    with pytest.raises(ValueError):
+        _sqlite_pragmas({'SQLITE_JOURNAL_MODE': 'WAL; DROP TABLE movie'})
+    assert "PRAGMA mmap_size = 0" in _sqlite_pragmas({'SQLITE_MMAP_SIZE': 0})
+
+
+def test_data_managers_on_one_file_share_an_engine(database_uri, tmp_path):
+    web = SQLiteDataManager(database_uri)
+    cli = SQLiteDataManager('sqlite:///movies.db', instance_path=str(tmp_path))
+    assert web.engine is cli.engine
+
+    web.create_user("alice")
+    assert [user['name'] for user in cli.get_all_users()] == ["alice"]
+
+    web.close()
+    assert cli.get_user_by_id(1)['name'] == "alice"
+    cli.close()
+    assert engines._engines == {}
+
+
+def test_engine_is_disposed_with_its_last_holder(database_uri):
+    first = acquire_engine(database_uri)
+    assert acquire_engine(database_uri) is first
+    release_engine(first)
+    release_engine(first)
+    second = acquire_engine(database_uri)
+    assert second is not first
+    release_engine(second)
+
+
+def test_migrations_run_once_per_engine(database_uri, monkeypatch):
+    calls = []
+    run_migrations = engines.run_migrations
+    monkeypatch.setattr(engines, 'run_migrations', lambda engine: calls.append(engine) or run_migrations(engine))
+    managers = [SQLiteDataManager(database_uri) for _ in range(3)]
+    assert len(calls) == 1
+    for data_manager in managers:
+        data_manager.close()
+
+
+def test_in_memory_databases_are_private():
+    first, second = SQLiteDataManager('sqlite://'), SQLiteDataManager('sqlite://')
+    assert first.engine is not second.engine
+    first.create_user("alice")
+    assert second.get_all_users() == []
+    first.close()
+    second.close()
@@ -0,0 +1,46 @@
+from jinja2 import DictLoader, Environment
+
+from fragment_cache import FragmentCache
+
+
+def make_env(source):
+    return Environment(loader=DictLoader({'card.html': source}), auto_reload=True, autoescape=True)
+
+
+def movie(movie_id, title, version=1):
+    return {'id': movie_id, 'title': title, 'version': version}
+
+
+def test_unchanged_cards_are_rendered_once():
+    cache = FragmentCache(make_env('<p>{{ movie.title }}</p>'))
+    movies = [movie(1, "Heat"), movie(2, "Alien & Aliens")]
+    first = cache.render_cards('card.html', movies)
+    assert first == ['<p>Heat</p>', '<p>Alien &amp; Aliens</p>']
+    assert cache.render_cards('card.html', movies) == first
+    assert (cache.hits, cache.misses, len(cache)) == (2, 2, 2)
+
+
+def test_new_row_version_renders_again():
+    cache = FragmentCache(make_env('<p>{{ movie.title }}</p>'))
+    cache.render_cards('card.html', [movie(1, "Haet")])
+    assert cache.render_cards('card.html', [movie(1, "Heat", version=2)]) == ['<p>Heat</p>']
+    assert cache.misses == 2
+
+
+def test_template_change_renders_again():
+    env = make_env('<p>{{ movie.title }}</p>')
+    cache = FragmentCache(env)
+    cache.render_cards('card.html', [movie(1, "Heat")])
+    env.loader.mapping['card.html'] = '<li>{{ movie.title }}</li>'
+    assert cache.render_cards('card.html', [movie(1, "Heat")]) == ['<li>Heat</li>']
+
+
+def test_least_recently_used_cards_are_evicted():
+    cache = FragmentCache(make_env('{{ movie.title }}'), maxsize=2)
+    cache.render_cards('card.html', [movie(1, "Heat"), movie(2, "Alien")])
+    cache.render_cards('card.html', [movie(1, "Heat"), movie(3, "Brazil")])
+    assert len(cache) == 2
+    cache.render_cards('card.html', [movie(1, "Heat")])
+    assert cache.hits == 2
+    cache.render_cards('card.html', [movie(2, "Alien")])
+    assert cache.misses == 4
@@ -0,0 +1,20 @@
+import os
+import stat
+
+from fs_utils import atomic_write
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = str(tmp_path / 'page.html')
+    atomic_write(path, b'old')
+    assert atomic_write(path, b'new') == 3
+    with open(path, 'rb') as f:
+        assert f.read() == b'new'
+    assert os.listdir(tmp_path) == ['page.html']
+
+
+def test_atomic_write_gives_the_mode_open_would(tmp_path):
+    atomic_write(str(tmp_path / 'page.html'), b'page')
+    (tmp_path / 'opened.html').write_bytes(b'page')
+    assert stat.S_IMODE((tmp_path / 'page.html').stat().st_mode) == stat.S_IMODE(
+        (tmp_path / 'opened.html').stat().st_mode)
@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Web and network modules the command-line interface only loads on demand.
+WEB_MODULES = ('flask', 'werkzeug', 'jinja2', 'requests', 'app', 'site_builder', 'omdb_client')
+
+
+def test_cli_startup_does_not_load_the_web_stack():
+    script = f"import sys, main; print(sorted(name for name in {WEB_MODULES!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                            cwd=ROOT)
+    assert result.stdout.strip() == '[]'
@@ -0,0 +1,77 @@
+import sqlite3
+
+import sqlalchemy
+
+from storage.migrations import MIGRATIONS, get_schema_version, run_migrations
+from storage.sqlite_data_manager import SQLiteDataManager
+
+# The schema of instance/movies.db before any migration.
+BASELINE_SCHEMA = """
+    CREATE TABLE user (
+        id INTEGER NOT NULL,
+        name VARCHAR(80) NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (name)
+    );
+    CREATE TABLE movie (
+        id INTEGER NOT NULL,
+        title VARCHAR(120) NOT NULL,
+        director VARCHAR(120),
+        year INTEGER,
+        rating FLOAT,
+        poster_url VARCHAR(255),
+        imdb_id VARCHAR(20),
+        user_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    );
+"""
+MOVIE_INDEXES = {'ix_movie_user_id_rating', 'ix_movie_user_id_title', 'ix_movie_imdb_id'}
+
+
+def create_baseline_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.execute("INSERT INTO user (id, name) VALUES (1, 'alice')")
+    connection.execute("INSERT INTO movie (title, director, year, rating, user_id) "
+                       "VALUES ('Pulp Fiction', 'Quentin Tarantino', 1994, 8.9, 1)")
+    connection.commit()
+    connection.close()
+
+
+def movie_indexes(connection):
+    return {row[1] for row in connection.exec_driver_sql("PRAGMA index_list(movie)")}
+
+
+def test_migrates_baseline_database(tmp_path):
+    path = tmp_path / 'movies.db'
+    create_baseline_database(path)
+    data_manager = SQLiteDataManager(f"sqlite:///{path}")
+    with data_manager.engine.connect() as connection:
+        assert get_schema_version(connection) == MIGRATIONS[-1][0]
+        assert MOVIE_INDEXES <= movie_indexes(connection)
+    assert [movie['title'] for movie in data_manager.get_movies_by_user(1)] == ["Pulp Fiction"]
+    data_manager.close()
+
+
+def test_migrations_run_once(tmp_path):
+    path = tmp_path / 'movies.db'
+    create_baseline_database(path)
+    engine = sqlalchemy.create_engine(f"sqlite:///{path}")
+    try:
+        assert run_migrations(engine) == MIGRATIONS[-1][0]
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DROP INDEX ix_movie_imdb_id")
+        # Already at the latest version: nothing runs, the dropped index stays dropped.
+        assert run_migrations(engine) == MIGRATIONS[-1][0]
+        with engine.connect() as connection:
+            assert 'ix_movie_imdb_id' not in movie_indexes(connection)
+    finally:
+        engine.dispose()
+
+
+def test_user_movies_are_read_through_an_index(data_manager):
+    with data_manager.engine.connect() as connection:
+        assert MOVIE_INDEXES <= movie_indexes(connection)
+        plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN SELECT * FROM movie WHERE user_id = 1").all()
+    assert 'USING INDEX' in plan[0][3]
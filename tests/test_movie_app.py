@@ -0,0 +1,44 @@
+import pytest
+
+import omdb_client
+from movie_app import MovieApp
+
+HEAT = {
+    'Response': 'True', 'Title': 'Heat', 'Year': '1995', 'Director': 'N/A',
+    'imdbRating': '8.3', 'Poster': 'N/A', 'imdbID': 'tt0113277',
+}
+
+
+class StubClient:
+    def __init__(self, movie_data):
+        self.movie_data = movie_data
+
+    def fetch_by_title(self, title):
+        return self.movie_data
+
+
+@pytest.fixture
+def add_movie(data_manager, monkeypatch):
+    """Runs the menu's add command for a title the OMDb stub answers with movie_data."""
+    monkeypatch.setenv('OMDB_API_KEY', 'secret')
+    monkeypatch.setattr('builtins.input', lambda prompt: "Heat")
+    data_manager.create_user("alice")
+
+    def add(movie_data):
+        monkeypatch.setattr(omdb_client, 'get_client', lambda: StubClient(movie_data))
+        MovieApp(data_manager, 1)._command_add_movie()
+        return data_manager.get_movies_by_user(1)
+
+    return add
+
+
+def test_add_movie_stores_the_parsed_response(add_movie, capsys):
+    (movie,) = add_movie(HEAT)
+    assert (movie['title'], movie['director'], movie['year'], movie['rating']) == ("Heat", None, 1995, 8.3)
+    assert "added successfully" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('movie_data', [{**HEAT, 'Year': 'N/A'}, {'Response': 'True', 'Title': 'Heat'}])
+def test_add_movie_reports_unusable_responses(add_movie, capsys, movie_data):
+    assert add_movie(movie_data) == []
+    assert capsys.readouterr().out.startswith("Error: ")
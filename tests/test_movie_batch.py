@@ -0,0 +1,122 @@
+import io
+import json
+
+import pytest
+
+import movie_import
+from movie_batch import build_parser, run
+
+
+class StubClient:
+    def fetch_by_title(self, title):
+        if title == 'Haet':
+            return {'Response': 'False', 'Error': 'Movie not found!'}
+        return {'Response': 'True', 'Title': title, 'Year': '1995', 'Director': 'N/A', 'imdbRating': '7.5',
+                'Poster': 'N/A', 'imdbID': f'tt{len(title):07d}'}
+
+
+@pytest.fixture
+def collection(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    for title, rating in [("Heat", 8.3), ("Alien", 8.5), ("Brazil", 7.9)]:
+        data_manager.add_movie(1, title, "Director", 1995, rating, None, None)
+    data_manager.add_movie(2, "Zodiac", None, 2007, 7.7, None, None)
+    return data_manager
+
+
+def batch(data_manager, *argv, stdin=''):
+    """Runs a batch command, returns its exit status and decoded output lines."""
+    out = io.StringIO()
+    status = run(data_manager, build_parser().parse_args(argv), stdin=io.StringIO(stdin), stdout=out)
+    return status, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_list(collection):
+    status, lines = batch(collection, 'list', '--user', '1')
+    assert status == 0
+    assert [line['title'] for line in lines] == ["Heat", "Alien", "Brazil"]
+    assert set(lines[0]) == {'id', 'title', 'rating', 'year'}
+
+
+def test_sort_with_limit(collection):
+    status, lines = batch(collection, 'sort', '--user', '1', '--desc', '--limit', '2')
+    assert [line['title'] for line in lines] == ["Alien", "Heat"]
+
+
+def test_search_reads_queries_from_stdin(collection):
+    status, lines = batch(collection, 'search', '--user', '1', 'hea', '--file', '-', stdin="braz\n\nzod\n")
+    assert status == 0
+    assert [(line['query'], [movie['title'] for movie in line['movies']]) for line in lines] == [
+        ('hea', ["Heat"]), ('braz', ["Brazil"]), ('zod', [])]
+
+
+def test_delete_only_the_users_movies(collection):
+    status, lines = batch(collection, 'delete', '--user', '1', '1', '4')
+    assert status == 1
+    assert lines == [{'id': 1, 'deleted': True}, {'id': 4, 'deleted': False}]
+    assert [movie['title'] for movie in collection.get_movies_by_user(2)] == ["Zodiac"]
+
+
+def test_delete_database_error_goes_to_stderr(collection, capsys):
+    with collection.engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TRIGGER keep BEFORE DELETE ON movie "
+                                   "BEGIN SELECT RAISE(ABORT, 'read only'); END")
+    status, lines = batch(collection, 'delete', '--user', '1', '1')
+    assert (status, lines) == (1, [{'id': 1, 'deleted': False}])
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert "Database error" in captured.err
+
+
+def test_delete_rejects_invalid_ids(collection):
+    assert batch(collection, 'delete', '--user', '1', 'one') == (1, [])
+
+
+def test_stats_and_random(collection):
+    assert batch(collection, 'stats', '--user', '1')[1][0]['count'] == 3
+    status, lines = batch(collection, 'random', '--user', '2', '--count', '2')
+    assert status == 0 and [line['title'] for line in lines] == ["Zodiac", "Zodiac"]
+
+
+def test_export_to_file(collection, tmp_path):
+    path = tmp_path / 'movies.jsonl'
+    assert batch(collection, 'export', '--user', '1', '--output', str(path)) == (0, [])
+    rows = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert [row['title'] for row in rows] == ["Heat", "Alien", "Brazil"]
+
+
+def test_add_looks_titles_up(collection, monkeypatch, tmp_path):
+    monkeypatch.setenv('OMDB_API_KEY', 'secret')
+    monkeypatch.setattr(movie_import, 'get_client', StubClient)
+    titles = tmp_path / 'titles.csv'
+    titles.write_text("title,year\nMemento,2000\nHaet,1995\n", encoding='utf-8')
+    status, lines = batch(collection, 'add', '--user', '2', 'Heat', '--file', str(titles))
+    assert status == 1
+    assert [(line['title'], line['added']) for line in lines] == [("Heat", True), ("Memento", True),
+                                                                 ("Haet", False)]
+    assert len(collection.get_movies_by_user(2)) == 3
+
+
+def test_unknown_user_exits_2(collection, capsys):
+    assert batch(collection, 'list', '--user', '9') == (2, [])
+    assert "user 9 not found" in capsys.readouterr().err
+
+
+def test_missing_file_exits_1(collection, tmp_path, capsys):
+    assert batch(collection, 'search', '--user', '1', '--file', str(tmp_path / 'missing.txt')) == (1, [])
+    assert capsys.readouterr().err.startswith("Error:")
+
+
+def test_export_every_user_as_csv(collection, tmp_path):
+    path = tmp_path / 'movies.csv'
+    assert batch(collection, 'export', '--format', 'csv', '--output', str(path)) == (0, [])
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 5
+
+
+def test_import_from_stdin(collection):
+    stdin = '{"title": "Memento", "year": 2000}\n{"title": ""}\n'
+    status, lines = batch(collection, 'import', '--user', '2', '-', '--format', 'jsonl', stdin=stdin)
+    assert status == 1
+    assert lines == [{'line': 2, 'error': "title is required"}, {'imported': 1, 'rejected': 1, 'error': None}]
+    assert [movie['title'] for movie in collection.iter_movies_by_user(2)] == ["Zodiac", "Memento"]
@@ -0,0 +1,128 @@
+import io
+import json
+
+import pytest
+
+import movie_bulk_import
+from movie_bulk_import import MAX_REPORTED_ERRORS, detect_format, import_movies, validate_movie
+from movie_export import export_movies
+
+
+@pytest.fixture
+def users(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    return data_manager
+
+
+def jsonl(*rows):
+    return io.StringIO(''.join(json.dumps(row) + '\n' for row in rows))
+
+
+def test_detect_format():
+    assert (detect_format('movies.csv'), detect_format('movies.ndjson')) == ('csv', 'jsonl')
+    with pytest.raises(ValueError):
+        detect_format('movies.parquet')
+
+
+def test_validate_movie_converts_and_strips():
+    assert validate_movie({'title': ' Heat ', 'year': '1995', 'rating': '8.3', 'director': '',
+                           'imdb_id': 'tt0113277', 'budget': '60000000'}) == {
+        'title': 'Heat', 'director': None, 'year': 1995, 'rating': 8.3, 'poster_url': None, 'imdb_id': 'tt0113277'}
+
+
+@pytest.mark.parametrize('row', [
+    {'title': ''},
+    {'title': 'x' * 121},
+    {'title': 7},
+    {'title': 'Heat', 'year': 'nineteen'},
+    {'title': 'Heat', 'year': True},
+    {'title': 'Heat', 'year': float('inf')},
+    {'title': 'Heat', 'year': 10 ** 26},
+    {'title': 'Heat', 'year': str(-2 ** 63 - 1)},
+    {'title': 'Heat', 'rating': 11},
+    {'title': 'Heat', 'rating': 'nan'},
+    {'title': 'Heat', 'rating': '-inf'},
+    {'title': 'Heat', 'imdb_id': '0113277'},
+])
+def test_validate_movie_rejects_invalid_rows(row):
+    with pytest.raises(ValueError):
+        validate_movie(row)
+
+
+def test_out_of_range_numbers_are_rejected(users):
+    lines = io.StringIO('{"title": "Heat", "year": 1e400}\n'
+                        f'{{"title": "Alien", "year": {10 ** 26}}}\n'
+                        f'{{"title": "Brazil", "year": {2 ** 63 - 1}}}\n')
+    result = import_movies(users, 1, lines, 'jsonl')
+    assert (result.imported, result.rejected, result.failure) == (1, 2, None)
+    assert [line for line, _ in result.errors] == [1, 2]
+
+
+def test_integer_overflow_fails_the_import(users, monkeypatch):
+    # Rows that got past validation with an integer SQLite can't store.
+    monkeypatch.setattr(movie_bulk_import, 'validate_movie', lambda row: row)
+    result = import_movies(users, 1, jsonl({'title': "Heat"}, {'title': "Alien", 'year': 10 ** 26}), 'jsonl',
+                           batch_size=1)
+    assert (result.imported, result.rejected) == (1, 0)
+    assert result.failure.startswith("Database error, nothing from line 2 on was imported")
+
+
+def test_export_round_trip(users):
+    for title, rating in [("Heat", 8.3), ("Alien", None), ("Brazil, the film", 7.9)]:
+        users.add_movie(1, title, "Director", 1995, rating, None, "tt0113277")
+    for export_format in ('csv', 'jsonl'):
+        out = io.BytesIO()
+        export_movies(users, out, export_format, user_id=1)
+        lines = io.StringIO(out.getvalue().decode('utf-8'), newline='')
+        assert import_movies(users, 2, lines, export_format, batch_size=2) == (3, 0, [], None)
+
+    columns = ('title', 'director', 'year', 'rating', 'imdb_id')
+    originals = [tuple(movie[column] for column in columns) for movie in users.iter_movies_by_user(1)]
+    assert [tuple(movie[column] for column in columns) for movie in users.iter_movies_by_user(2)] == originals * 2
+
+
+def test_rejected_rows_are_reported(users):
+    lines = io.StringIO('{"title": "Heat"}\nnot json\n\n[1, 2]\n{"title": "Alien", "rating": 12}\n')
+    result = import_movies(users, 1, lines, 'jsonl')
+    assert (result.imported, result.rejected) == (1, 3)
+    assert [line_number for line_number, _ in result.errors] == [2, 4, 5]
+
+
+def test_only_the_first_errors_are_reported(users):
+    result = import_movies(users, 1, jsonl(*[{'title': ''}] * (MAX_REPORTED_ERRORS + 5)), 'jsonl')
+    assert result.rejected == MAX_REPORTED_ERRORS + 5
+    assert len(result.errors) == MAX_REPORTED_ERRORS
+
+
+def test_csv_without_title_column(users):
+    with pytest.raises(ValueError):
+        import_movies(users, 1, io.StringIO("name,year\nHeat,1995\n"), 'csv')
+
+
+def test_unknown_format(users):
+    with pytest.raises(ValueError):
+        import_movies(users, 1, io.StringIO(""), 'xml')
+
+
+@pytest.fixture
+def failing_insert(users):
+    """Makes inserting a movie titled 'Boom' fail inside SQLite."""
+    with users.engine.begin() as connection:
+        connection.exec_driver_sql("CREATE TRIGGER boom BEFORE INSERT ON movie WHEN NEW.title = 'Boom' "
+                                   "BEGIN SELECT RAISE(ABORT, 'boom'); END")
+    return users
+
+
+def test_database_error_fails_the_import(failing_insert):
+    rows = [{'title': title} for title in ("Heat", "Alien", "Brazil", "Boom", "Zodiac")]
+    result = import_movies(failing_insert, 1, jsonl(*rows), 'jsonl', batch_size=2)
+    assert (result.imported, result.rejected) == (2, 0)
+    assert result.failure.startswith("Database error, nothing from line 3 on was imported: boom")
+    assert [movie['title'] for movie in failing_insert.iter_movies_by_user(1)] == ["Heat", "Alien"]
+
+
+def test_bulk_load_pragmas_are_restored(failing_insert):
+    import_movies(failing_insert, 1, jsonl({'title': "Boom"}), 'jsonl')
+    with failing_insert.engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -64000
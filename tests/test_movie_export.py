@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+import pytest
+
+import movie_export
+from movie_export import EXPORT_COLUMNS, available_formats, export_movies, iter_export
+
+
+@pytest.fixture
+def collection(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    for i in range(25):
+        data_manager.add_movie(1 + i % 2, f"Movie {i:02d}, part \"{i}\"", None, 2000 + i, i / 4 or None, None, None)
+    return data_manager
+
+
+def export(data_manager, export_format, user_id=None, batch_size=10):
+    out = io.BytesIO()
+    assert export_movies(data_manager, out, export_format, user_id=user_id, batch_size=batch_size) == len(
+        out.getvalue())
+    return out.getvalue()
+
+
+def test_csv_export(collection):
+    rows = list(csv.DictReader(io.StringIO(export(collection, 'csv').decode('utf-8'))))
+    assert len(rows) == 25
+    assert tuple(rows[0]) == EXPORT_COLUMNS
+    assert rows[3]['title'] == 'Movie 03, part "3"'
+    assert rows[0]['rating'] == ''
+
+
+def test_jsonl_export_of_one_user(collection):
+    rows = [json.loads(line) for line in export(collection, 'jsonl', user_id=2).splitlines()]
+    assert [row['title'][:8] for row in rows] == [f"Movie {i:02d}" for i in range(1, 25, 2)]
+    assert set(rows[0]) == set(EXPORT_COLUMNS)
+
+
+def test_export_is_streamed_in_batches(collection):
+    chunks = list(iter_export(collection, 'jsonl', batch_size=10))
+    assert [chunk.count(b'\n') for chunk in chunks] == [10, 10, 5]
+
+
+def test_parquet_export(collection):
+    pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+    table = pyarrow_parquet.read_table(io.BytesIO(export(collection, 'parquet')))
+    assert table.num_rows == 25
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert pyarrow_parquet.ParquetFile(io.BytesIO(export(collection, 'parquet'))).num_row_groups == 3
+
+
+def test_unknown_format_raises_value_error_eagerly(collection, monkeypatch):
+    with pytest.raises(ValueError):
+        iter_export(collection, 'xml')
+    monkeypatch.setattr(movie_export, 'pyarrow', None)
+    assert available_formats() == ['csv', 'jsonl']
+    with pytest.raises(ValueError):
+        iter_export(collection, 'parquet')
@@ -0,0 +1,43 @@
+import io
+
+import pytest
+import requests
+
+from movie_import import read_titles, resolve_titles
+
+
+def omdb_movie(title, imdb_id):
+    return {'Response': 'True', 'Title': title, 'Year': '1995', 'Director': 'N/A', 'imdbRating': '7.5',
+            'Poster': 'N/A', 'imdbID': imdb_id}
+
+
+class StubClient:
+    responses = {
+        'Heat': omdb_movie('Heat', 'tt0113277'),
+        'Alien': omdb_movie('Alien', 'tt0078748'),
+        'Haet': {'Response': 'False', 'Error': 'Movie not found!'},
+        'Offline': requests.exceptions.ConnectionError('no route to host'),
+    }
+
+    def fetch_by_title(self, title):
+        response = self.responses[title]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.mark.parametrize('text', [
+    "Heat\n\nAlien\n heat \n",
+    "year,title\n1995,Heat\n1979,Alien\n1995,HEAT\n",
+    "Heat,1995\nAlien,1979\n",
+])
+def test_read_titles(text):
+    assert read_titles(io.StringIO(text)) == ['Heat', 'Alien']
+
+
+def test_resolve_titles_keeps_input_order():
+    movies, failures = resolve_titles(['Haet', 'Heat', 'Offline', 'Alien'], client=StubClient(), max_workers=3)
+    assert [movie['title'] for movie in movies] == ['Heat', 'Alien']
+    assert [title for title, _ in failures] == ['Haet', 'Offline']
+    assert failures[0][1] == 'Movie not found!'
+
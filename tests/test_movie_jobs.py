@@ -0,0 +1,88 @@
+import pytest
+import requests
+
+import movie_jobs
+from movie_jobs import MovieJobQueue
+from storage.sqlite_data_manager import SQLiteDataManager
+
+HEAT = {
+    'Response': 'True', 'Title': 'Heat', 'Year': '1995', 'Director': 'Michael Mann',
+    'imdbRating': '8.3', 'Poster': 'N/A', 'imdbID': 'tt0113277',
+}
+
+
+class StubClient:
+    def __init__(self, responses):
+        self.responses = responses
+
+    def fetch_by_title(self, title):
+        response = self.responses[title]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def data_manager(tmp_path):
+    # The workers run in threads of their own, each needs a connection of its own.
+    data_manager = SQLiteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    yield data_manager
+    data_manager.close()
+
+
+@pytest.fixture
+def omdb(monkeypatch):
+    client = StubClient({
+        'Heat': HEAT,
+        'Haet': {'Response': 'False', 'Error': 'Movie not found!'},
+        'Offline': requests.exceptions.ConnectionError('no route to host'),
+        'Broken': {**HEAT, 'Year': 'N/A'},
+    })
+    monkeypatch.setattr(movie_jobs, 'get_client', lambda: client)
+    return client
+
+
+def run_jobs(app, data_manager, titles):
+    data_manager.create_user("alice")
+    queue = MovieJobQueue(app, data_manager, max_workers=2)
+    job_ids = [queue.enqueue(1, title) for title in titles]
+    queue.shutdown()
+    return [data_manager.get_job(job_id) for job_id in job_ids]
+
+
+def test_job_adds_the_movie(app, data_manager, omdb):
+    (job,) = run_jobs(app, data_manager, ['Heat'])
+    assert job['status'] == 'done'
+    assert [movie['title'] for movie in data_manager.get_movies_by_user(1)] == ['Heat']
+
+
+@pytest.mark.parametrize('title, error', [
+    ('Haet', "Movie not found!"),
+    ('Offline', "Error fetching movie details from OMDb API"),
+    ('Broken', "Error fetching movie details from OMDb API"),
+])
+def test_failed_lookup_fails_the_job(app, data_manager, omdb, title, error):
+    (job,) = run_jobs(app, data_manager, [title])
+    assert job['status'] == 'failed'
+    assert job['error'].startswith(error)
+    assert data_manager.get_movies_by_user(1) == []
+
+
+def test_enqueue_many(app, data_manager, omdb):
+    data_manager.create_user("alice")
+    queue = MovieJobQueue(app, data_manager, max_workers=2)
+    job_ids = queue.enqueue_many(1, ['Heat', 'Haet'])
+    queue.shutdown()
+    assert [job['status'] for job in data_manager.get_jobs(1, job_ids[0], job_ids[-1])] == ['done', 'failed']
+
+
+def test_resume_unfinished_jobs(app, data_manager, omdb):
+    data_manager.create_user("alice")
+    pending = data_manager.create_job(1, 'Heat')
+    running = data_manager.create_job(1, 'Heat')
+    # Claimed by a worker of a process that has since stopped.
+    data_manager.claim_job(running, stale_after_seconds=600)
+    queue = MovieJobQueue(app, data_manager)
+    queue.resume_unfinished()
+    queue.shutdown()
+    assert [data_manager.get_job(job_id)['status'] for job_id in (pending, running)] == ['done', 'done']
@@ -0,0 +1,81 @@
+import pytest
+
+import omdb_cache
+from omdb_cache import OMDbCache, normalize_title
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(omdb_cache.time, 'time', clock)
+    return clock
+
+
+def found(title, imdb_id):
+    return {'Response': 'True', 'Title': title, 'imdbID': imdb_id}
+
+
+NOT_FOUND = {'Response': 'False', 'Error': 'Movie not found!'}
+
+
+def test_normalize_title():
+    assert normalize_title('  The   GODFATHER ') == 'the godfather'
+
+
+def test_response_is_cached_by_title_and_imdb_id(clock):
+    cache = OMDbCache(':memory:')
+    cache.put(found('Heat', 'tt0113277'), title='Heat')
+    assert cache.get_by_title('HEAT ') == found('Heat', 'tt0113277')
+    assert cache.get_by_imdb_id('tt0113277') == found('Heat', 'tt0113277')
+    assert cache.get_by_title('Alien') is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = OMDbCache(':memory:', ttl=60, negative_ttl=10)
+    cache.put(found('Heat', 'tt0113277'), title='Heat')
+    cache.put(NOT_FOUND, title='Haet')
+
+    clock.now += 10
+    assert cache.get_by_title('Haet') is None
+    assert cache.get_by_title('Heat') is not None
+
+    clock.now += 50
+    assert cache.get_by_title('Heat') is None
+    assert cache.get_by_imdb_id('tt0113277') is None
+
+
+def test_other_errors_are_not_cached(clock):
+    cache = OMDbCache(':memory:')
+    cache.put({'Response': 'False', 'Error': 'Request limit reached!'}, title='Heat')
+    assert cache.get_by_title('Heat') is None
+
+
+def test_least_recently_used_entries_are_evicted(clock):
+    cache = OMDbCache(':memory:', max_entries=2)
+    cache.put(NOT_FOUND, title='Alien')
+    clock.now += 1
+    cache.put(NOT_FOUND, title='Brazil')
+    clock.now += 1
+    cache.get_by_title('Alien')
+    clock.now += 1
+    cache.put(NOT_FOUND, title='Heat')
+
+    assert cache.get_by_title('Brazil') is None
+    assert cache.get_by_title('Alien') == NOT_FOUND
+    assert cache.get_by_title('Heat') == NOT_FOUND
+
+
+def test_cache_persists_in_its_file(clock, tmp_path):
+    path = tmp_path / 'cache' / 'omdb_cache.db'
+    cache = OMDbCache(str(path))
+    cache.put(found('Heat', 'tt0113277'), title='Heat')
+    cache.close()
+    assert OMDbCache(str(path)).get_by_title('Heat')['imdbID'] == 'tt0113277'
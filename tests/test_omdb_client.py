@@ -0,0 +1,128 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+import omdb_client
+from omdb_cache import OMDbCache
+
+
+class StubOMDb(BaseHTTPRequestHandler):
+    """Answers with the queued (status, body) responses, then with the last one."""
+
+    def do_GET(self):
+        self.server.requests.append(parse_qs(urlsplit(self.path).query))
+        responses = self.server.responses
+        status, body = responses.pop(0) if len(responses) > 1 else responses[0]
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def omdb(monkeypatch):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubOMDb)
+    server.requests = []
+    server.responses = [(200, {'Response': 'True', 'Title': 'Heat'})]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(omdb_client, 'OMDB_URL', f'http://127.0.0.1:{server.server_port}/')
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(**kwargs):
+    return omdb_client.OMDbClient('secret', backoff_factor=0, **kwargs)
+
+
+def test_fetch_by_title_sends_encoded_title_and_key(omdb):
+    client = make_client()
+    assert client.fetch_by_title('Heat & Dust') == {'Response': 'True', 'Title': 'Heat'}
+    assert omdb.requests == [{'t': ['Heat & Dust'], 'apikey': ['secret']}]
+    client.close()
+
+
+def test_fetch_by_title_retries_transient_errors(omdb):
+    omdb.responses = [(503, {}), (502, {}), (200, {'Title': 'Heat'})]
+    client = make_client()
+    assert client.fetch_by_title('Heat') == {'Title': 'Heat'}
+    assert len(omdb.requests) == 3
+    client.close()
+
+
+def test_fetch_by_title_gives_up_after_retries(omdb):
+    omdb.responses = [(503, {})]
+    client = make_client(retries=2)
+    with pytest.raises(requests.exceptions.RequestException):
+        client.fetch_by_title('Heat')
+    assert len(omdb.requests) == 3
+    client.close()
+
+
+def test_fetch_by_title_rejects_invalid_json(omdb):
+    omdb.responses = [(200, 'not json')]
+    client = make_client()
+    with pytest.raises(ValueError):
+        client.fetch_by_title('Heat')
+    client.close()
+
+
+def test_cached_answers_skip_the_request(omdb):
+    omdb.responses = [(200, {'Response': 'True', 'Title': 'Heat', 'imdbID': 'tt0113277'})]
+    client = make_client(cache=OMDbCache(':memory:'))
+    client.fetch_by_title('Heat')
+    assert client.fetch_by_title(' heat ') == omdb.responses[0][1]
+    assert client.fetch_by_imdb_id('tt0113277')['Title'] == 'Heat'
+    assert len(omdb.requests) == 1
+    client.close()
+
+
+def test_get_client_is_shared(monkeypatch, tmp_path):
+    monkeypatch.setattr(omdb_client, '_client', None)
+    monkeypatch.setenv('OMDB_API_KEY', 'secret')
+    monkeypatch.setenv('OMDB_CACHE_PATH', str(tmp_path / 'omdb_cache.db'))
+    client = omdb_client.get_client()
+    assert client is omdb_client.get_client()
+    assert client.api_key == 'secret'
+    assert (tmp_path / 'omdb_cache.db').exists()
+    client.close()
+    client.cache.close()
+
+
+HEAT = {
+    'Response': 'True', 'Title': 'Heat', 'Year': '1995', 'Director': 'Michael Mann',
+    'imdbRating': '8.3', 'Poster': 'https://example.com/heat.jpg', 'imdbID': 'tt0113277',
+}
+
+
+def test_parse_movie():
+    assert omdb_client.parse_movie(HEAT) == {
+        'title': 'Heat', 'director': 'Michael Mann', 'year': 1995, 'rating': 8.3,
+        'poster_url': 'https://example.com/heat.jpg', 'imdb_id': 'tt0113277',
+    }
+
+
+def test_parse_movie_maps_missing_values():
+    movie = omdb_client.parse_movie({**HEAT, 'Year': '2008–2013', 'Director': 'N/A', 'imdbRating': 'N/A',
+                                     'Poster': 'N/A'})
+    assert (movie['year'], movie['director'], movie['rating'], movie['poster_url']) == (2008, None, 0.0, None)
+
+
+@pytest.mark.parametrize('movie_data', [
+    {key: value for key, value in HEAT.items() if key != 'imdbID'},
+    {**HEAT, 'Year': 'N/A'},
+    {**HEAT, 'imdbRating': 'great'},
+])
+def test_parse_movie_rejects_incomplete_responses(movie_data):
+    with pytest.raises(ValueError):
+        omdb_client.parse_movie(movie_data)
@@ -0,0 +1,67 @@
+import gzip
+import os
+
+import pytest
+from flask import Flask
+
+import precompress
+from precompress import compress_directory, compress_file, send_precompressed
+
+CSS = b'body { color: black; }\n' * 100
+
+
+@pytest.fixture(autouse=True)
+def without_brotli(monkeypatch):
+    # The sibling set depends on whether brotli is installed, pin it to gzip only.
+    monkeypatch.setattr(precompress, 'brotli', None)
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / 'style.css').write_bytes(CSS)
+    (tmp_path / 'script.js').write_bytes(b'alert(1)')
+    return tmp_path
+
+
+def test_compress_file_writes_missing_and_stale_siblings(static_dir):
+    path = str(static_dir / 'style.css')
+    assert compress_file(path) > 0
+    assert gzip.decompress((static_dir / 'style.css.gz').read_bytes()) == CSS
+    assert compress_file(path) == 0
+
+    (static_dir / 'style.css').write_bytes(CSS + b'a { }\n')
+    os.utime(path, (os.path.getmtime(path) + 10,) * 2)
+    assert compress_file(path) > 0
+    assert gzip.decompress((static_dir / 'style.css.gz').read_bytes()).endswith(b'a { }\n')
+
+
+def test_compress_directory_only_compresses_html_and_css(static_dir):
+    compress_directory(str(static_dir))
+    assert sorted(os.listdir(static_dir)) == ['script.js', 'style.css', 'style.css.gz']
+
+
+@pytest.fixture
+def client(static_dir):
+    app = Flask(__name__)
+    app.add_url_rule('/assets/<path:filename>', 'assets',
+                     lambda filename: send_precompressed(str(static_dir), filename))
+    return app.test_client()
+
+
+def test_sends_gzip_sibling_when_accepted(client, static_dir):
+    compress_directory(str(static_dir))
+    response = client.get('/assets/style.css', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype == 'text/css'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == CSS
+
+
+@pytest.mark.parametrize('accept_encoding, compressed', [('identity', True), ('gzip', False)])
+def test_sends_plain_file_otherwise(client, static_dir, accept_encoding, compressed):
+    if compressed:
+        compress_directory(str(static_dir))
+    response = client.get('/assets/style.css', headers={'Accept-Encoding': accept_encoding})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.data == CSS
@@ -0,0 +1,36 @@
+import pytest
+
+from storage.records import MovieRecord, UserRecord
+
+
+def test_record_supports_attribute_and_item_access():
+    movie = MovieRecord(id=1, title="Heat", rating=8.3)
+    assert (movie.title, movie['rating'], movie.get('year', 1995)) == ("Heat", 8.3, 1995)
+    assert 'title' in movie and 'year' not in movie
+    with pytest.raises(KeyError):
+        movie['year']
+    assert movie.get(0) is None
+
+
+def test_projected_record_only_has_selected_fields():
+    movie = MovieRecord.from_mapping({'title': "Heat", 'id': 1})
+    assert movie.keys() == ['id', 'title']
+    assert movie.to_dict() == {'id': 1, 'title': "Heat"}
+    assert repr(movie) == "MovieRecord(id=1, title='Heat')"
+
+
+def test_records_are_immutable():
+    movie = MovieRecord(id=1, title="Heat")
+    with pytest.raises(AttributeError):
+        movie.title = "Alien"
+    with pytest.raises(AttributeError):
+        del movie.title
+    with pytest.raises(AttributeError):
+        movie.budget = 1
+
+
+def test_records_compare_by_type_and_values():
+    assert MovieRecord(id=1, title="Heat") == MovieRecord(title="Heat", id=1)
+    assert len({MovieRecord(id=1), MovieRecord(id=1), MovieRecord(id=2)}) == 2
+    assert MovieRecord(id=1) != UserRecord(id=1)
+    assert MovieRecord(id=1) != {'id': 1}
@@ -0,0 +1,95 @@
+import os
+
+import pytest
+from flask import Flask
+
+from site_builder import CARDS_DIRNAME, MANIFEST_FILENAME, PAGE_FILENAME, SiteBuilder, build_all_sites
+from storage.records import MovieRecord
+from storage.sqlite_data_manager import SQLiteDataManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def site_app(tmp_path):
+    """An app with the project's templates and the endpoints they link to."""
+    app = Flask(__name__, root_path=ROOT, instance_path=str(tmp_path / 'instance'))
+    for rule, endpoint in [('/users', 'users_list'), ('/add_user', 'add_user'),
+                           ('/users/<int:user_id>/update_movie/<int:movie_id>', 'update_movie'),
+                           ('/users/<int:user_id>/delete_movie/<int:movie_id>', 'delete_movie')]:
+        app.add_url_rule(rule, endpoint, lambda **kwargs: '')
+    return app
+
+
+@pytest.fixture
+def builder(site_app, tmp_path):
+    return SiteBuilder(site_app, None, output_root=str(tmp_path / 'sites'))
+
+
+def movie(movie_id, title, rating=7.0):
+    return MovieRecord(id=movie_id, user_id=1, title=title, director=None, year=1995, rating=rating, poster_url=None,
+                       imdb_id=None, version=1)
+
+
+MOVIES = [movie(1, "Heat"), movie(2, "Alien"), movie(3, "Brazil")]
+
+
+def read_page(builder, user_id=1):
+    with open(os.path.join(builder.site_dir(user_id), PAGE_FILENAME), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_first_build_renders_everything(builder):
+    result = builder.build(1, MOVIES)
+    assert (result.cards_rendered, result.cards_reused, result.page_written) == (3, 0, True)
+    page = read_page(builder)
+    assert all(title in page for title in ("Heat", "Alien", "Brazil"))
+    assert os.path.exists(os.path.join(builder.site_dir(1), MANIFEST_FILENAME))
+
+
+def test_unchanged_rebuild_writes_nothing(builder):
+    builder.build(1, MOVIES)
+    result = builder.build(1, MOVIES)
+    assert (result.cards_rendered, result.cards_reused, result.page_written, result.bytes_written) == (0, 3, False, 0)
+
+
+def test_rebuild_renders_only_changed_cards(builder):
+    builder.build(1, MOVIES)
+    result = builder.build(1, [MOVIES[0], movie(2, "Aliens"), movie(4, "Zodiac")])
+    assert (result.cards_rendered, result.cards_reused, result.page_written) == (2, 1, True)
+
+    cards = sorted(os.listdir(os.path.join(builder.site_dir(1), CARDS_DIRNAME)))
+    assert cards == ['1.html', '2.html', '4.html']
+    page = read_page(builder)
+    assert "Aliens" in page and "Zodiac" in page and "Brazil" not in page
+
+
+def test_missing_page_is_rewritten(builder):
+    builder.build(1, MOVIES)
+    os.remove(os.path.join(builder.site_dir(1), PAGE_FILENAME))
+    assert builder.build(1, MOVIES).page_written
+
+
+def test_template_change_renders_every_card(builder, monkeypatch):
+    builder.build(1, MOVIES)
+    monkeypatch.setattr(builder, '_template_hash', lambda: 'changed')
+    assert builder.build(1, MOVIES).cards_rendered == 3
+
+
+def test_sites_default_to_the_instance_folder(site_app):
+    assert SiteBuilder(site_app, None).site_dir(7) == os.path.join(site_app.instance_path, 'sites', '7')
+
+
+def test_build_all_sites_in_workers(site_app, tmp_path):
+    data_manager = SQLiteDataManager(f"sqlite:///{tmp_path / 'movies.db'}")
+    for name, titles in [("alice", ["Heat", "Alien"]), ("bob", ["Brazil"])]:
+        data_manager.create_user(name)
+        for title in titles:
+            data_manager.add_movie(len(data_manager.get_all_users()), title, None, 1995, 7.0, None, None)
+    builder = SiteBuilder(site_app, data_manager, output_root=str(tmp_path / 'sites'))
+
+    results = {user_id: (result, error) for user_id, result, error in build_all_sites(builder, [1, 2], workers=2)}
+    assert {user_id: error for user_id, (_, error) in results.items()} == {1: None, 2: None}
+    assert results[1][0].cards_rendered == 2 and results[2][0].cards_rendered == 1
+    assert "Brazil" in read_page(builder, 2)
+    assert builder.build_user_site(1, batch_size=1).cards_reused == 2
@@ -0,0 +1,428 @@
+import base64
+import json
+import re
+
+import pytest
+from sqlalchemy import event
+
+from storage.records import MovieRecord
+from storage.sqlite_data_manager import SQLiteDataManager
+
+
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def add_movie(data_manager, user_id, title, rating=None, director=None, year=None):
+    data_manager.add_movie(user_id, title, director, year, rating, None, None)
+
+
+@pytest.fixture
+def collection(data_manager):
+    """A user whose movies share titles and ratings and partly have no rating."""
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    titles = ["Alien", "Heat", "Alien", "Brazil", "Zodiac", "Heat", "Memento"]
+    ratings = [8.5, None, 7.0, 8.5, None, 8.5, 7.0]
+    for i in range(40):
+        add_movie(data_manager, 1, titles[i % 7], ratings[i % 7])
+    add_movie(data_manager, 2, "Heat", 9.0)
+    return data_manager.get_movies_by_user(1)
+
+
+def expected_ids(movies, sort):
+    column = sort.lstrip('-')
+    descending = sort.startswith('-')
+    # SQLite sorts NULL before any value.
+    with_value = sorted((m for m in movies if m[column] is not None), key=lambda m: (m[column], m['id']),
+                        reverse=descending)
+    without_value = sorted((m for m in movies if m[column] is None), key=lambda m: m['id'], reverse=descending)
+    ordered = with_value + without_value if descending else without_value + with_value
+    return [m['id'] for m in ordered]
+
+
+@pytest.mark.parametrize('sort', ['title', '-title', 'rating', '-rating'])
+@pytest.mark.parametrize('page_size', [1, 3, 7, 50])
+def test_movie_pages_round_trip(data_manager, collection, sort, page_size):
+    pages = [data_manager.get_movies_page(1, sort=sort, page_size=page_size)]
+    while pages[-1]['next_cursor']:
+        pages.append(data_manager.get_movies_page(1, sort=sort, cursor=pages[-1]['next_cursor'],
+                                                  page_size=page_size))
+    forward = [m['id'] for page in pages for m in page['movies']]
+    assert forward == expected_ids(collection, sort)
+    assert all(len(page['movies']) == page_size for page in pages[:-1])
+    assert pages[0]['prev_cursor'] is None
+
+    backward = []
+    page = pages[-1]
+    while page['prev_cursor']:
+        page = data_manager.get_movies_page(1, sort=sort, cursor=page['prev_cursor'], page_size=page_size)
+        backward = [m['id'] for m in page['movies']] + backward
+    assert backward + [m['id'] for m in pages[-1]['movies']] == forward
+
+
+@pytest.mark.parametrize('sort', ['title', '-title', 'rating', '-rating'])
+def test_movie_pages_seek_the_sort_index(data_manager, collection, sort):
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    cursors = []
+    page = data_manager.get_movies_page(1, sort=sort, page_size=3)
+    while page['next_cursor']:
+        cursors.append(page['next_cursor'])
+        page = data_manager.get_movies_page(1, sort=sort, cursor=page['next_cursor'], page_size=3)
+    event.listen(data_manager.engine, 'before_cursor_execute', record)
+    try:
+        for cursor in cursors:
+            data_manager.get_movies_page(1, sort=sort, cursor=cursor, page_size=3)
+    finally:
+        event.remove(data_manager.engine, 'before_cursor_execute', record)
+
+    with data_manager.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = ' '.join(row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}",
+                                                                         parameters))
+            # A range on the index, not a scan of all the user's rows from the start.
+            assert re.search(r'USING INDEX \w+ \(user_id=\? AND \w+[<>=]\?', plan), plan
+
+
+def test_movie_pages_of_user_without_movies(data_manager):
+    data_manager.create_user("alice")
+    assert data_manager.get_movies_page(1) == {'movies': [], 'next_cursor': None, 'prev_cursor': None}
+
+
+def test_unknown_sort_key_raises_value_error(data_manager, collection):
+    with pytest.raises(ValueError):
+        data_manager.get_movies_page(1, sort='year')
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    encode_cursor(["sideways", None, 1]),
+    encode_cursor(["after", None, "3"]),
+    encode_cursor(["after", None]),
+    encode_cursor(["after", {"a": 1}, 3]),
+    encode_cursor(["after", [1], 3]),
+    encode_cursor(["after", True, 3]),
+    encode_cursor(["after", None, True]),
+])
+def test_invalid_cursor_raises_value_error(data_manager, collection, cursor):
+    with pytest.raises(ValueError):
+        data_manager.get_movies_page(1, cursor=cursor)
+
+
+def test_stats_of_user_without_movies(data_manager):
+    data_manager.create_user("alice")
+    assert data_manager.get_user_movie_stats(1) is None
+
+
+def test_stats_leave_out_unrated_movies(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    for title, rating in [("Heat", 8.0), ("Alien", None), ("Brazil", 6.0), ("Zodiac", 9.5)]:
+        add_movie(data_manager, 1, title, rating)
+    add_movie(data_manager, 2, "Memento", 1.0)
+
+    assert data_manager.get_user_movie_stats(1) == {
+        'count': 4,
+        'rated_count': 3,
+        'average': pytest.approx(23.5 / 3),
+        'median': 8.0,
+        'best': {'title': "Zodiac", 'rating': 9.5},
+        'worst': {'title': "Brazil", 'rating': 6.0},
+    }
+
+
+def test_stats_median_of_even_count(data_manager):
+    data_manager.create_user("alice")
+    for title, rating in [("Heat", 8.0), ("Brazil", 6.0), ("Zodiac", 9.5), ("Alien", 7.0)]:
+        add_movie(data_manager, 1, title, rating)
+    assert data_manager.get_user_movie_stats(1)['median'] == 7.5
+
+
+def test_stats_without_ratings(data_manager):
+    data_manager.create_user("alice")
+    add_movie(data_manager, 1, "Heat")
+    stats = data_manager.get_user_movie_stats(1)
+    assert (stats['count'], stats['rated_count']) == (1, 0)
+    assert stats['median'] is stats['best'] is stats['worst'] is None
+
+
+def test_random_movie_of_user_without_movies(data_manager):
+    data_manager.create_user("alice")
+    assert data_manager.get_random_movie(1) is None
+
+
+def test_random_movie_is_one_of_the_users_movies(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    add_movie(data_manager, 1, "Heat")
+    for i in range(20):
+        add_movie(data_manager, 2, f"Other {i}")
+    add_movie(data_manager, 1, "Alien")
+
+    titles = {data_manager.get_random_movie(1, attempts=1)['title'] for _ in range(50)}
+    assert titles <= {"Heat", "Alien"}
+
+
+def test_random_movie_fallback_seeks_both_ways(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    add_movie(data_manager, 1, "Heat")
+    for i in range(20):
+        add_movie(data_manager, 2, f"Other {i}")
+    add_movie(data_manager, 1, "Alien")
+
+    # Seeking only upwards picked Alien for 21 of the 22 possible draws.
+    titles = [data_manager.get_random_movie(1, attempts=0)['title'] for _ in range(400)]
+    assert titles.count("Heat") > 100 and titles.count("Alien") > 100
+
+
+def test_random_movie_probes_the_index(data_manager):
+    data_manager.create_user("alice")
+    add_movie(data_manager, 1, "Heat")
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(data_manager.engine, 'before_cursor_execute', record)
+    try:
+        data_manager.get_random_movie(1, attempts=0)
+    finally:
+        event.remove(data_manager.engine, 'before_cursor_execute', record)
+
+    with data_manager.engine.connect() as connection:
+        for statement, parameters in statements:
+            plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            searches = [step for step in plan if step.startswith('SEARCH movie')]
+            assert searches and all('ix_movie_user_id_id (user_id=?' in step for step in searches), plan
+
+
+@pytest.fixture
+def searchable(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    add_movie(data_manager, 1, "The Godfather", director="Francis Ford Coppola")
+    add_movie(data_manager, 1, "Apocalypse Now", director="Francis Ford Coppola")
+    add_movie(data_manager, 1, "Francis Ha", director="Noah Baumbach")
+    add_movie(data_manager, 2, "The Godfather Part II", director="Francis Ford Coppola")
+
+
+def search_titles(data_manager, user_id, query):
+    return [movie['title'] for movie in data_manager.search_movies(user_id, query)]
+
+
+def test_search_matches_word_prefixes(data_manager, searchable):
+    assert search_titles(data_manager, 1, "godf") == ["The Godfather"]
+    assert search_titles(data_manager, 2, "godf") == ["The Godfather Part II"]
+    assert search_titles(data_manager, 1, "coppola apoc") == ["Apocalypse Now"]
+
+
+def test_search_ranks_title_above_director(data_manager, searchable):
+    assert search_titles(data_manager, 1, "francis")[0] == "Francis Ha"
+
+
+def test_search_without_words(data_manager, searchable):
+    assert data_manager.search_movies(1, '"*') == []
+
+
+def test_search_follows_updates_and_deletes(data_manager, searchable):
+    data_manager.update_movie(1, "Heat", "Michael Mann", 1995, 8.3)
+    assert search_titles(data_manager, 1, "godfather") == []
+    assert search_titles(data_manager, 1, "mann") == ["Heat"]
+
+    data_manager.delete_movie(1)
+    assert search_titles(data_manager, 1, "heat") == []
+
+
+@pytest.mark.parametrize('sort', ['title', '-title', 'rating', '-rating'])
+def test_movies_by_user_ordered_and_limited(data_manager, collection, sort):
+    ordered = [movie['id'] for movie in data_manager.get_movies_by_user(1, order_by=sort)]
+    assert ordered == expected_ids(collection, sort)
+    top = [movie['id'] for movie in data_manager.get_movies_by_user(1, order_by=sort, limit=5)]
+    assert top == ordered[:5]
+
+
+def test_movies_by_user_rejects_unknown_sort_key(data_manager, collection):
+    with pytest.raises(ValueError):
+        data_manager.get_movies_by_user(1, order_by='-year')
+
+
+def test_claim_job_once(data_manager):
+    data_manager.create_user("alice")
+    job_id = data_manager.create_job(1, "Heat")
+    assert data_manager.get_unfinished_job_ids() == [job_id]
+    assert data_manager.claim_job(job_id, stale_after_seconds=600)
+    assert not data_manager.claim_job(job_id, stale_after_seconds=600)
+    # A job running for longer than stale_after_seconds can be claimed again.
+    assert data_manager.claim_job(job_id, stale_after_seconds=-1)
+    assert data_manager.get_job(job_id)['status'] == 'running'
+
+
+def test_finish_job_inserts_the_movie(data_manager):
+    data_manager.create_user("alice")
+    done, failed = data_manager.create_job(1, "Heat"), data_manager.create_job(1, "Haet")
+    for job_id in (done, failed):
+        data_manager.claim_job(job_id, stale_after_seconds=600)
+    data_manager.finish_job(done, movie={'title': "Heat", 'director': "Michael Mann", 'year': 1995,
+                                         'rating': 8.3, 'poster_url': None, 'imdb_id': 'tt0113277'})
+    data_manager.finish_job(failed, error="Movie not found!")
+
+    job = data_manager.get_job(done)
+    assert job['status'] == 'done'
+    assert data_manager.get_movie_by_id(job['movie_id']).title == "Heat"
+    assert data_manager.get_job(failed)['status'] == 'failed'
+    assert data_manager.get_job(failed)['error'] == "Movie not found!"
+    assert data_manager.get_unfinished_job_ids() == []
+
+
+def test_requeued_job_is_finished_once(data_manager):
+    data_manager.create_user("alice")
+    job_id = data_manager.create_job(1, "Heat")
+    data_manager.claim_job(job_id, stale_after_seconds=600)
+    # The process running the job restarts: the job is requeued and claimed again.
+    assert data_manager.requeue_running_jobs() == 1
+    assert data_manager.get_job(job_id)['status'] == 'pending'
+    assert data_manager.claim_job(job_id, stale_after_seconds=600)
+
+    movie = {'title': "Heat", 'director': None, 'year': 1995, 'rating': 8.3, 'poster_url': None, 'imdb_id': None}
+    data_manager.finish_job(job_id, movie=movie)
+    data_manager.finish_job(job_id, movie=movie)
+    data_manager.finish_job(job_id, error="late failure")
+    job = data_manager.get_job(job_id)
+    assert (job['status'], job['error']) == ('done', None)
+    assert len(data_manager.get_movies_by_user(1)) == 1
+    assert data_manager.get_user_version(1)[0] == 1
+
+
+def test_import_jobs_are_consecutive(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    data_manager.create_job(2, "Zodiac")
+    job_ids = data_manager.create_jobs(1, ["Heat", "Alien", "Brazil"])
+    assert job_ids == list(range(job_ids[0], job_ids[0] + 3))
+    assert [job['title'] for job in data_manager.get_jobs(1, job_ids[0], job_ids[-1])] == ["Heat", "Alien", "Brazil"]
+    assert data_manager.get_jobs(2, job_ids[0], job_ids[-1]) == []
+
+
+def test_pending_job_is_not_finished(data_manager):
+    data_manager.create_user("alice")
+    job_id = data_manager.create_job(1, "Heat")
+    data_manager.finish_job(job_id, error="not claimed")
+    assert data_manager.get_job(job_id)['status'] == 'pending'
+
+
+@pytest.mark.parametrize('batch_size', [1, 7, 40, 100])
+def test_iter_movies_by_user_in_batches(data_manager, collection, batch_size):
+    movies = list(data_manager.iter_movies_by_user(1, batch_size=batch_size))
+    assert movies == sorted(collection, key=lambda movie: movie['id'])
+
+
+def test_movie_changes_bump_the_user_version(data_manager):
+    data_manager.create_user("alice")
+    data_manager.create_user("bob")
+    assert data_manager.get_user_version(1)[0] == 0
+    assert data_manager.get_user_version(3) is None
+
+    add_movie(data_manager, 1, "Heat")
+    data_manager.update_movie(1, "Heat", "Michael Mann", 1995, 8.3)
+    data_manager.delete_movie(1)
+    version, updated_at = data_manager.get_user_version(1)
+    assert version == 3 and updated_at is not None
+    assert data_manager.get_user_version(2)[0] == 0
+
+
+def test_update_movie_changes_the_title(data_manager):
+    data_manager.create_user("alice")
+    add_movie(data_manager, 1, "Haet")
+    data_manager.update_movie(1, "Heat", "Michael Mann", 1995, 8.3)
+    assert data_manager.get_movies_by_user(1)[0]['title'] == "Heat"
+
+
+def test_users_version_follows_the_user_list(data_manager):
+    assert data_manager.get_users_version() == (0, None, None)
+    data_manager.create_user("alice")
+    count, highest_id, _ = data_manager.get_users_version()
+    assert (count, highest_id) == (1, 1)
+
+
+def test_movie_version_changes_on_update(data_manager):
+    data_manager.create_user("alice")
+    add_movie(data_manager, 1, "Haet")
+    (before,) = data_manager.get_movies_by_user(1)
+    data_manager.update_movie(1, "Heat", None, 1995, 8.3)
+    (after,) = data_manager.get_movies_by_user(1)
+    assert after['version'] != before['version']
+
+
+@pytest.mark.parametrize('sort', ['title', '-rating'])
+def test_iter_movies_by_user_in_sort_order(data_manager, collection, sort):
+    movies = data_manager.iter_movies_by_user(1, order_by=sort, batch_size=3)
+    assert [movie['id'] for movie in movies] == expected_ids(collection, sort)
+
+
+def test_stream_movie_batches_of_every_user(data_manager, collection):
+    batches = list(data_manager.stream_movie_batches(batch_size=16))
+    assert [len(batch) for batch in batches] == [16, 16, 9]
+    assert [movie['id'] for batch in batches for movie in batch] == list(range(1, 42))
+
+
+@pytest.mark.parametrize('stream', ['iter_movies_by_user', 'stream_movie_batches'])
+def test_streams_reject_unknown_sort_key_eagerly(data_manager, collection, stream):
+    with pytest.raises(ValueError):
+        getattr(data_manager, stream)(1, order_by='year')
+
+
+def test_movie_page_projects_fields(data_manager, collection):
+    page = data_manager.get_movies_page(1, sort='-rating', page_size=3, fields=['title', 'title'])
+    assert [movie.keys() for movie in page['movies']] == [['title']] * 3
+    following = data_manager.get_movies_page(1, sort='-rating', cursor=page['next_cursor'], page_size=3,
+                                             fields=['id'])
+    assert [movie['id'] for movie in following['movies']] == expected_ids(collection, '-rating')[3:6]
+
+    with pytest.raises(ValueError):
+        data_manager.get_movies_page(1, fields=['title', 'budget'])
+
+
+def test_users_page_round_trip(data_manager):
+    for name in ("alice", "bob", "carol", "dave", "erin"):
+        data_manager.create_user(name)
+    pages = [data_manager.get_users_page(page_size=2, fields=['name'])]
+    while pages[-1]['next_cursor']:
+        pages.append(data_manager.get_users_page(cursor=pages[-1]['next_cursor'], page_size=2, fields=['name']))
+    assert [[user['name'] for user in page['users']] for page in pages] == [
+        ["alice", "bob"], ["carol", "dave"], ["erin"]]
+
+
+def test_get_movie_projects_fields(data_manager, collection):
+    assert data_manager.get_movie(2, fields=['title', 'rating']).to_dict() == {'title': "Heat", 'rating': None}
+    assert data_manager.get_movie(999) is None
+
+
+def test_reads_return_records(data_manager):
+    data_manager.create_user("alice")
+    add_movie(data_manager, 1, "Heat", 8.3)
+    assert data_manager.get_all_users() == [data_manager.get_user_by_id(1)]
+    assert data_manager.get_user_by_id(1)['name'] == "alice"
+    assert data_manager.get_user_by_id(2) is None
+    (movie,) = data_manager.get_movies_by_user(1)
+    assert isinstance(movie, MovieRecord)
+    assert (movie.title, movie['rating'], movie.get('user_id')) == ("Heat", 8.3, 1)
+    assert data_manager.get_random_movie(1) == movie
+
+
+def test_relative_database_path_is_resolved_against_instance_path(tmp_path):
+    data_manager = SQLiteDataManager('sqlite:///movies.db', instance_path=str(tmp_path / 'instance'))
+    data_manager.create_user("alice")
+    data_manager.close()
+    assert (tmp_path / 'instance' / 'movies.db').exists()
+
+
+def test_delete_movies_of_one_user(data_manager, collection):
+    ids = sorted(movie['id'] for movie in collection)
+    assert sorted(data_manager.delete_movies(1, ids[:3] + ids[:1] + [41, 999])) == ids[:3]
+    assert len(data_manager.get_movies_by_user(1)) == 37
+    assert len(data_manager.get_movies_by_user(2)) == 1